@@ -0,0 +1,84 @@
+"""
+core/api_key_usage.py — Deferred api_keys.last_used bookkeeping
+
+verify_api_key records each successful lookup here instead of issuing an
+UPDATE inside the request. A lifespan-managed task flushes the coalesced
+timestamps (latest per key) in one UPDATE ... FROM (VALUES ...) every few
+seconds.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from psycopg2.extras import execute_values
+
+from core.db import get_db_context
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 5.0
+_FLUSH_LAST_USED = (
+    "UPDATE api_keys AS k SET last_used = v.used_at "
+    "FROM (VALUES %s) AS v (used_at, id) WHERE k.id = v.id"
+)
+
+# key id -> epoch seconds of the latest use; formatted only at flush time
+_pending: dict[str, float] = {}
+_clock = time.time
+_pending_lock = threading.Lock()
+_task_handle = None
+
+
+def record_api_key_use(key_id: str) -> None:
+    """Remember that key_id was just used; written on the next flush."""
+    with _pending_lock:
+        _pending[key_id] = _clock()
+
+
+def flush_api_key_usage() -> int:
+    """Write all pending last_used timestamps. Returns the number of keys written."""
+    with _pending_lock:
+        if not _pending:
+            return 0
+        pending = list(_pending.items())
+        _pending.clear()
+    batch = [(datetime.fromtimestamp(used_at, timezone.utc).isoformat(), key_id) for key_id, used_at in pending]
+    try:
+        with get_db_context() as conn:
+            execute_values(conn.cursor(), _FLUSH_LAST_USED, batch, page_size=len(batch))
+    except Exception as e:
+        logger.warning(f"Failed to flush API key usage for {len(batch)} keys: {e}")
+        with _pending_lock:
+            for key_id, used_at in pending:
+                _pending.setdefault(key_id, used_at)
+        return 0
+    return len(batch)
+
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+        await asyncio.to_thread(flush_api_key_usage)
+
+
+async def start_api_key_usage_flusher():
+    """Start the periodic flush task. Called once during app startup (lifespan)."""
+    global _task_handle
+    if _task_handle and not _task_handle.done():
+        return
+    _task_handle = asyncio.create_task(_flush_loop())
+
+
+async def stop_api_key_usage_flusher():
+    """Cancel the flush task and write whatever is still pending."""
+    global _task_handle
+    if _task_handle and not _task_handle.done():
+        _task_handle.cancel()
+        try:
+            await _task_handle
+        except asyncio.CancelledError:
+            pass
+    _task_handle = None
+    await asyncio.to_thread(flush_api_key_usage)
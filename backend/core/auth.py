@@ -3,13 +3,17 @@ core/auth.py — Shared authentication utilities
 
 Single source of truth for:
   - JWT SECRET_KEY / ALGORITHM constants
-  - hash_password / verify_password
+  - hash_password / verify_password (+ *_async variants for request handlers)
+  - verify_dummy_password_async (timing-equalised login failures)
+  - password_needs_rehash (legacy bcrypt → Argon2id upgrade on login)
   - create_access_token
   - verify_jwt_token
   - get_current_user  (optional user, returns None if not authenticated)
   - require_auth      (strict user, raises 401 if not authenticated)
+  - require_auth_id   (strict, token-only: returns the user id without a DB read)
   - verify_api_key    (X-API-Key header check against api_keys table)
 """
+import asyncio
 import os
 import logging
 from datetime import datetime, timezone, timedelta
@@ -17,13 +21,19 @@ from typing import Optional
 
 import bcrypt
 import hashlib
+import hmac
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 import psycopg2
 from fastapi import Header, HTTPException, Security
 from fastapi.security import APIKeyHeader
 from jose import jwt, JWTError
 from psycopg2.pool import PoolError
 
+from core.api_key_usage import record_api_key_use
+from core.cache import TTLCache
 from core.db import get_db_context
+from core.utils import secret_equals
 
 logger = logging.getLogger(__name__)
 
@@ -40,10 +50,20 @@ ACCESS_TOKEN_EXPIRE_DAYS = 30
 
 _MCP_SERVICE_KEY: str = os.environ.get("MCP_SERVICE_KEY", "")
 
+# Server-side pepper for API key digests. When set, a leaked api_keys table
+# cannot be brute-forced offline without it; unset keeps plain SHA-256.
+API_KEY_PEPPER: str = os.environ.get("API_KEY_PEPPER", "")
+
 _api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
 def hash_api_key(api_key: str) -> str:
+    if API_KEY_PEPPER:
+        return hmac.new(API_KEY_PEPPER.encode("utf-8"), api_key.encode("utf-8"), hashlib.sha256).hexdigest()
+    return _legacy_hash_api_key(api_key)
+
+
+def _legacy_hash_api_key(api_key: str) -> str:
     return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
 
 
@@ -51,12 +71,82 @@ def hash_api_key(api_key: str) -> str:
 # Password Hashing
 # ─────────────────────────────────────────────
 
+# New passwords are hashed with Argon2id (OWASP baseline: 19 MiB, t=2).
+# Hashes written by older releases are bcrypt; they still verify and are
+# upgraded on the next successful login (see password_needs_rehash).
+# The cost is tunable per deployment; hashes made with other parameters keep
+# verifying and are rehashed to the current ones on login.
+_password_hasher = PasswordHasher(
+    time_cost=int(os.environ.get("ARGON2_TIME_COST", "2")),
+    memory_cost=int(os.environ.get("ARGON2_MEMORY_COST_KIB", "19456")),
+    parallelism=int(os.environ.get("ARGON2_PARALLELISM", "2")),
+)
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    return _password_hasher.hash(password)
 
 
 def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    if hashed.startswith(_BCRYPT_PREFIXES):
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    try:
+        return _password_hasher.verify(hashed, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True for legacy bcrypt hashes and Argon2 hashes with outdated parameters."""
+    if hashed.startswith(_BCRYPT_PREFIXES):
+        return True
+    try:
+        return _password_hasher.check_needs_rehash(hashed)
+    except InvalidHashError:
+        return True
+
+
+# Both KDFs release the GIL while hashing, so running them on a worker thread
+# keeps the event loop serving other requests during the deliberately slow work.
+# A semaphore caps concurrent hashes (each Argon2 call holds ~19 MiB and
+# saturates cores), so a login burst queues on the loop instead of filling
+# the shared default thread pool.
+# Compose passes an empty value when unset, so "" falls back to the default too
+_KDF_CONCURRENCY = int(os.environ.get("PASSWORD_HASH_CONCURRENCY") or os.cpu_count() or 2)
+_kdf_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_kdf_semaphore() -> asyncio.Semaphore:
+    global _kdf_semaphore
+    if _kdf_semaphore is None:
+        _kdf_semaphore = asyncio.Semaphore(_KDF_CONCURRENCY)
+    return _kdf_semaphore
+
+
+async def hash_password_async(password: str) -> str:
+    async with _get_kdf_semaphore():
+        return await asyncio.to_thread(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    async with _get_kdf_semaphore():
+        return await asyncio.to_thread(verify_password, password, hashed)
+
+
+_dummy_password_hash: Optional[str] = None
+
+
+async def verify_dummy_password_async(password: str) -> None:
+    """Spend one verification's worth of time when there is no hash to check.
+
+    Keeps unknown-email login failures as slow as wrong-password ones so
+    response timing does not reveal which emails are registered.
+    """
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = await hash_password_async(os.urandom(16).hex())
+    await verify_password_async(password, _dummy_password_hash)
 
 
 # ─────────────────────────────────────────────
@@ -65,27 +155,42 @@ def verify_password(password: str, hashed: str) -> bool:
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """Encode a JWT access token with an expiry."""
-    to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (
         expires_delta or timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
     )
-    to_encode.update({"exp": expire})
-    token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    token = jwt.encode({**data, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
     logger.debug(f"Created access token for sub: {data.get('sub')}")
     return token
 
 
+# Successfully verified tokens → sub, so clients re-sending the same bearer
+# token skip the HMAC + JSON decode. Only the claim is cached: user rows are
+# still read per request (see require_admin_auth), and entries never outlive
+# the token's own exp.
+_TOKEN_CACHE_TTL_SECONDS = 30
+_token_cache = TTLCache(maxsize=10_000, ttl=_TOKEN_CACHE_TTL_SECONDS)
+
+
 def verify_jwt_token(token: str) -> Optional[str]:
     """
     Decode and validate a JWT token.
     Returns the user_id (sub claim) on success, None on any failure.
     """
+    cache_key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    user_id = _token_cache.get(cache_key)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
         if user_id is None:
             logger.warning("JWT payload missing 'sub' claim")
             return None
+        ttl = _TOKEN_CACHE_TTL_SECONDS
+        if isinstance(payload.get("exp"), (int, float)):
+            ttl = min(ttl, payload["exp"] - datetime.now(timezone.utc).timestamp())
+        if ttl > 0:
+            _token_cache.set(cache_key, user_id, ttl=ttl)
         return user_id
     except JWTError as e:
         logger.warning(f"JWT verification failed: {e}")
@@ -96,6 +201,16 @@ def verify_jwt_token(token: str) -> Optional[str]:
 # FastAPI Dependency Functions
 # ─────────────────────────────────────────────
 
+# Hot-path statements, kept as constants so every call sends byte-identical SQL
+# (the form pg_stat_statements and any driver-side statement cache key on).
+# Explicit columns keep secrets (password_hash, github_token) out of the
+# per-request user dict and off the wire.
+USER_COLUMNS = "id, github_id, username, email, avatar_url, github_url, plan, is_admin, created_at, updated_at"
+_SELECT_USER_BY_ID = f"SELECT {USER_COLUMNS} FROM users WHERE id = %s"
+# The digest is the lookup key (unique index), so a match is the check itself;
+# no secret is ever compared in Python.
+_SELECT_API_KEY_BY_HASH = "SELECT id, user_id, name FROM api_keys WHERE key_hash = %s"
+
 def get_current_user(authorization: str = Header(None)) -> Optional[dict]:
     """
     Optional authentication dependency.
@@ -113,7 +228,7 @@ def get_current_user(authorization: str = Header(None)) -> Optional[dict]:
             return None
         with get_db_context() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+            cursor.execute(_SELECT_USER_BY_ID, (user_id,))
             user = cursor.fetchone()
             if user:
                 return dict(user)
@@ -132,7 +247,7 @@ def require_auth(authorization: str = Header(None)) -> dict:
     Strict authentication dependency — raises HTTP 401 if user is not authenticated.
     Use as: user: dict = Depends(require_auth)
     """
-    if _MCP_SERVICE_KEY and authorization == f"Bearer {_MCP_SERVICE_KEY}":
+    if _MCP_SERVICE_KEY and secret_equals(authorization, f"Bearer {_MCP_SERVICE_KEY}"):
         return {"id": "mcp-service", "username": "mcp-service", "is_admin": True}
     user = get_current_user(authorization)
     if not user:
@@ -140,6 +255,25 @@ def require_auth(authorization: str = Header(None)) -> dict:
     return user
 
 
+def require_auth_id(authorization: str = Header(None)) -> str:
+    """
+    Strict authentication dependency that returns only the user id.
+
+    Decodes the bearer token without reading the users row, for handlers
+    that only scope queries by user id. Anything that needs profile fields
+    or authorization flags (is_admin, plan) must keep using require_auth.
+    """
+    # Trade-off: nothing checks that the user row still exists, so a deleted or
+    # disabled user keeps access through these handlers until the JWT expires.
+    if _MCP_SERVICE_KEY and secret_equals(authorization, f"Bearer {_MCP_SERVICE_KEY}"):
+        return "mcp-service"
+    parts = (authorization or "").split()
+    user_id = verify_jwt_token(parts[1]) if len(parts) == 2 and parts[0].lower() == "bearer" else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user_id
+
+
 def require_admin_auth(authorization: str = Header(None)) -> dict:
     """Require an authenticated administrator.
 
@@ -161,23 +295,32 @@ async def verify_api_key(api_key: str = Security(_api_key_header)) -> Optional[d
     if not api_key:
         return None
 
-    if _MCP_SERVICE_KEY and api_key == _MCP_SERVICE_KEY:
+    if secret_equals(api_key, _MCP_SERVICE_KEY):
         return {"id": "mcp-service", "user_id": None, "is_service": True}
 
-    # Hash incoming key for comparison
-    hashed_key = hash_api_key(api_key)
+    # Hash incoming key for comparison; the lookup runs on a worker thread so a
+    # slow or exhausted pool never stalls the event loop.
+    hashed_key = hash_api_key(api_key)
+    key_row = await asyncio.to_thread(_lookup_api_key, api_key, hashed_key)
+    if key_row:
+        record_api_key_use(key_row["id"])
+        return dict(key_row)
+    return None
+
 
+def _lookup_api_key(api_key: str, hashed_key: str) -> Optional[dict]:
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM api_keys WHERE key_hash = %s", (hashed_key,))
+        cursor.execute(_SELECT_API_KEY_BY_HASH, (hashed_key,))
         key_row = cursor.fetchone()
-        if key_row:
-            cursor.execute(
-                "UPDATE api_keys SET last_used = %s WHERE id = %s",
-                (datetime.now(timezone.utc).isoformat(), key_row["id"]),
-            )
-            return dict(key_row)
-    return None
+        if not key_row and API_KEY_PEPPER:
+            # Keys stored before the pepper was configured: accept the plain
+            # digest once and rewrite it so the next lookup hits directly.
+            cursor.execute(_SELECT_API_KEY_BY_HASH, (_legacy_hash_api_key(api_key),))
+            key_row = cursor.fetchone()
+            if key_row:
+                cursor.execute("UPDATE api_keys SET key_hash = %s WHERE id = %s", (hashed_key, key_row["id"]))
+    return key_row
 
 
 async def require_api_key(api_key: str = Security(_api_key_header)) -> dict:
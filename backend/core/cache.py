@@ -0,0 +1,60 @@
+"""
+core/cache.py — Small in-process TTL cache
+
+Used for short-lived, per-worker memoisation of values that are expensive to
+recompute but safe to serve slightly stale (decoded JWTs, settings rows,
+GitHub lookups). Not shared across workers; every entry expires on its own.
+"""
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire ``ttl`` seconds after insert.
+
+    When full, expired entries are purged first and then the oldest insert is
+    evicted, so memory stays bounded by ``maxsize``.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: dict[Hashable, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self.maxsize:
+                for stale in [k for k, (exp, _) in self._data.items() if exp <= now]:
+                    del self._data[stale]
+                while len(self._data) >= self.maxsize:
+                    del self._data[next(iter(self._data))]
+            self._data[key] = (now + (self.ttl if ttl is None else ttl), value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -4,7 +4,7 @@ core/db.py — Shared database utilities (PostgreSQL)
 Single source of truth for:
   - DB connection via DATABASE_URL env var (postgresql://)
   - get_db_context() context manager
-  - get_github_settings() helper
+  - get_github_settings() helper (+ invalidate_github_settings)
 
 Both the prompt manager and memory system use the same PostgreSQL instance.
 """
@@ -16,6 +16,7 @@ from typing import Optional, Dict, Any
 
 import psycopg2
 import psycopg2.extras
+from core.cache import TTLCache
 from core.secrets import decrypt_secret
 from core.db_pool import acquire_connection, return_connection
 
@@ -53,8 +54,9 @@ def get_db() -> psycopg2.extensions.connection:
 @contextmanager
 def get_db_context():
     """
-    Context manager that opens a PostgreSQL connection, commits on success,
-    and closes on exit (even on error).
+    Context manager that borrows a pooled PostgreSQL connection, commits on
+    success (rolls back on error), and always returns it to the pool, so
+    warm server backends are reused across requests rather than reconnected.
 
     Usage:
         with get_db_context() as conn:
@@ -72,6 +74,16 @@ def get_db_context():
         return_connection(DATABASE_URL, conn)
 
 
+# Decrypted settings rows keyed by user_id (None for the default row). Writers
+# in routes/settings.py call invalidate_github_settings after committing, but
+# that only clears this worker; with WEB_CONCURRENCY > 1 the others keep the old
+# storage_mode / github_token until the entry expires, and writes made in that
+# window would land on the old backend. The TTL keeps the window to a few
+# seconds while still absorbing the repeated reads within one request burst.
+_settings_cache = TTLCache(maxsize=1024, ttl=5)
+_NO_SETTINGS = object()
+
+
 def get_github_settings(user_id: str = None) -> Optional[Dict[str, Any]]:
     """
     Fetch GitHub / storage settings from the settings table.
@@ -81,6 +93,11 @@ def get_github_settings(user_id: str = None) -> Optional[Dict[str, Any]]:
 
     Returns a dict of the row or None if no row exists.
     """
+    cached = _settings_cache.get(user_id)
+    if cached is _NO_SETTINGS:
+        return None
+    if cached is not None:
+        return dict(cached)
     try:
         with get_db_context() as conn:
             cursor = conn.cursor()
@@ -89,11 +106,19 @@ def get_github_settings(user_id: str = None) -> Optional[Dict[str, Any]]:
             else:
                 cursor.execute("SELECT * FROM settings WHERE id = 1")
             row = cursor.fetchone()
-            if row:
-                result = dict(row)
-                if result.get("github_token"):
-                    result["github_token"] = decrypt_secret(result["github_token"])
-                return result
+        if not row:
+            _settings_cache.set(user_id, _NO_SETTINGS)
+            return None
+        result = dict(row)
+        if result.get("github_token"):
+            result["github_token"] = decrypt_secret(result["github_token"])
+        _settings_cache.set(user_id, result)
+        return dict(result)
     except Exception as e:
         logger.error(f"Failed to fetch settings from DB: {e}")
     return None
+
+
+def invalidate_github_settings(user_id: str = None) -> None:
+    """Drop the cached settings row after it has been written."""
+    _settings_cache.pop(user_id)
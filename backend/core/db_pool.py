@@ -9,6 +9,24 @@ from psycopg2.pool import PoolError, ThreadedConnectionPool
 _lock = threading.Lock()
 _returned = threading.Condition()
 _pools: dict[str, ThreadedConnectionPool] = {}
+# Per-URL borrow counters for the ops health endpoint. Updated without a lock:
+# they are advisory and an occasional lost increment is acceptable.
+_stats: dict[str, dict[str, int]] = {}
+
+_SYNCHRONOUS_COMMIT_LEVELS = {"on", "off", "local", "remote_write", "remote_apply"}
+
+
+def _connect_kwargs() -> dict:
+    """Session settings applied once per pooled connection at connect time.
+
+    DB_SYNCHRONOUS_COMMIT=off lets commits return before the WAL flush; a
+    crash can lose the last few hundred ms of commits but never corrupts data.
+    Unset keeps the server default.
+    """
+    level = os.environ.get("DB_SYNCHRONOUS_COMMIT", "").strip().lower()
+    if level in _SYNCHRONOUS_COMMIT_LEVELS:
+        return {"options": f"-c synchronous_commit={level}"}
+    return {}
 
 
 def get_pool(url: str) -> ThreadedConnectionPool:
@@ -23,6 +41,7 @@ def get_pool(url: str) -> ThreadedConnectionPool:
                 int(os.environ.get("DB_POOL_MAX", "20")),
                 dsn=url,
                 cursor_factory=psycopg2.extras.RealDictCursor,
+                **_connect_kwargs(),
             )
             _pools[url] = pool
         return pool
@@ -42,19 +61,43 @@ def acquire_connection(url: str, timeout: float | None = None):
         except (TypeError, ValueError):
             timeout = 5.0
     deadline = time.monotonic() + timeout
+    stats = _stats.setdefault(url, {"acquired": 0, "waited": 0, "timed_out": 0})
+    waited = False
     while True:
         try:
-            return get_pool(url).getconn()
+            connection = get_pool(url).getconn()
+            stats["acquired"] += 1
+            stats["waited"] += waited
+            return connection
         except PoolError as exc:
             remaining = deadline - time.monotonic()
             if remaining <= 0:
+                stats["timed_out"] += 1
                 raise PoolError(f"connection pool exhausted after waiting {timeout:g}s") from exc
+            waited = True
             with _returned:
                 _returned.wait(timeout=min(0.1, remaining))
 
 
+def pool_stats() -> dict[str, dict[str, int]]:
+    """Snapshot of pool occupancy and borrow counters, keyed by DSN."""
+    with _lock:
+        pools = dict(_pools)
+    return {
+        url: {
+            "min": pool.minconn,
+            "max": pool.maxconn,
+            "in_use": len(pool._used),
+            "idle": len(pool._pool),
+            **_stats.get(url, {}),
+        }
+        for url, pool in pools.items()
+    }
+
+
 def close_all_pools() -> None:
     with _lock:
         for pool in _pools.values():
             pool.closeall()
         _pools.clear()
+        _stats.clear()
@@ -0,0 +1,128 @@
+"""
+core/github.py — Rate-limit-aware GitHub REST calls
+
+Provides:
+  - github_request()  : one call through the shared client, bounded in
+                        concurrency and retried on primary/secondary rate limits
+  - github_paginate() : follows Link rel="next" and concatenates list pages
+
+Every outbound api.github.com call goes through here so bursts (prompt
+creation, reorders, the write-behind drain) back off instead of spending
+the 5000/hr budget and then failing hard.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from core.http import get_http_client
+
+logger = logging.getLogger(__name__)
+
+API_ROOT = "https://api.github.com"
+MAX_CONCURRENCY = 20
+MAX_ATTEMPTS = 5
+# Slow down pre-emptively once a token is this close to its hourly budget
+LOW_REMAINING = 5
+# Never park a request longer than this; past it the 403/429 is surfaced
+MAX_WAIT_SECONDS = 60.0
+
+_semaphore: Optional[asyncio.Semaphore] = None
+# token fingerprint -> epoch seconds at which its budget resets
+_exhausted_until: Dict[str, float] = {}
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _token_key(headers: Dict[str, str]) -> str:
+    return hashlib.sha256(headers.get("Authorization", "").encode()).hexdigest()[:16]
+
+
+def _rate_limit_wait(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait before retrying, or None when this is not a rate-limit reply."""
+    if response.status_code not in (403, 429):
+        return None
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        reset = response.headers.get("X-RateLimit-Reset", "")
+        return max(0.0, float(reset) - time.time()) if reset.isdigit() else 60.0
+    if response.status_code == 429 or "rate limit" in response.text.lower():
+        return 60.0
+    return None
+
+
+def _note_budget(key: str, response: httpx.Response) -> None:
+    remaining = response.headers.get("X-RateLimit-Remaining", "")
+    reset = response.headers.get("X-RateLimit-Reset", "")
+    if remaining.isdigit() and int(remaining) < LOW_REMAINING and reset.isdigit():
+        _exhausted_until[key] = float(reset)
+    else:
+        _exhausted_until.pop(key, None)
+
+
+async def github_request(
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    json: Any = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> httpx.Response:
+    """Send one GitHub API request; ``url`` may be absolute or a path under api.github.com.
+
+    Waits out rate limits (Retry-After / X-RateLimit-Reset, plus jitter) for up
+    to MAX_ATTEMPTS tries; any other status is returned for the caller to map.
+    """
+    if url.startswith("/"):
+        url = f"{API_ROOT}{url}"
+    key = _token_key(headers)
+    response = None
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        wait = _exhausted_until.get(key, 0.0) - time.time()
+        if 0 < wait <= MAX_WAIT_SECONDS:
+            await asyncio.sleep(wait + random.uniform(0, 1))
+        async with _get_semaphore():
+            response = await get_http_client().request(method, url, headers=headers, json=json, params=params)
+        _note_budget(key, response)
+        wait = _rate_limit_wait(response)
+        if wait is None or attempt == MAX_ATTEMPTS or wait > MAX_WAIT_SECONDS:
+            return response
+        logger.warning(f"GitHub rate limited ({response.status_code}) on {method} {url}; retrying in {wait:.0f}s")
+        await asyncio.sleep(wait + random.uniform(0, 1) * attempt)
+    return response
+
+
+async def github_paginate(
+    url: str,
+    headers: Dict[str, str],
+    params: Optional[Dict[str, Any]] = None,
+    max_pages: int = 50,
+) -> List[Any]:
+    """GET every page of a list endpoint (per_page=100) and return the items."""
+    items: List[Any] = []
+    params = {"per_page": 100, **(params or {})}
+    for _ in range(max_pages):
+        response = await github_request("GET", url, headers, params=params)
+        if response.status_code != 200:
+            raise httpx.HTTPStatusError(
+                f"GitHub API error: {response.status_code} - {response.text}",
+                request=response.request,
+                response=response,
+            )
+        items.extend(response.json())
+        next_url = response.links.get("next", {}).get("url")
+        if not next_url:
+            break
+        # The next link already carries the query string
+        url, params = next_url, None
+    return items
@@ -0,0 +1,36 @@
+"""
+core/http.py — Shared outbound HTTP client
+
+Provides:
+  - get_http_client()   : process-wide httpx.AsyncClient (keep-alive pool)
+  - close_http_client() : called from the server lifespan on shutdown
+
+Reusing one client keeps TCP/TLS connections to GitHub and the LLM/embedding
+providers warm across requests instead of paying a fresh handshake per call;
+long provider calls pass their own timeout per request. With h2 installed the client
+speaks HTTP/2, so concurrent section fetches multiplex over one connection.
+"""
+import importlib.util
+
+import httpx
+
+# httpx only needs h2 when http2=True; fall back to HTTP/1.1 without it.
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Module-level shared client, created on first use inside the event loop
+_http_client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared AsyncClient (httpx default 5s timeout)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(http2=_HTTP2_AVAILABLE)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -3,9 +3,22 @@ core/utils.py — Shared utility functions
 
 Small helpers used across routes and services to avoid inline duplication.
 """
+import hmac
 from datetime import datetime, timezone
+from typing import Optional
+
+# Bound once: utcnow() runs on every write path.
+_UTC = timezone.utc
+_now = datetime.now
 
 
 def utcnow() -> str:
     """Return current UTC time as an ISO-8601 string (timezone-aware)."""
-    return datetime.now(timezone.utc).isoformat()
+    return _now(_UTC).isoformat()
+
+
+def secret_equals(candidate: Optional[str], secret: str) -> bool:
+    """Constant-time comparison for credentials; False when either side is empty."""
+    if not candidate or not secret:
+        return False
+    return hmac.compare_digest(candidate.encode("utf-8"), secret.encode("utf-8"))
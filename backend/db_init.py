@@ -1,20 +1,27 @@
 """
 db_init.py — Database initialization and seeding (PostgreSQL)
 
-Contains: init_db(), seed_admin_user(), and the default template seed data.
+Contains: init_db(), seed_admin_user(), and default template seeding
+(definitions live in default_templates.json next to this module).
 All tables now live in the PostgreSQL 'memory' database alongside the memory system.
 """
 import json
+import os
 import uuid
 import logging
 from datetime import datetime, timezone
 
+import orjson
+from psycopg2.extras import execute_values
+
 from core.auth import hash_api_key, hash_password
 from core.db import get_db_context
 from core.secrets import encrypt_secret, is_encrypted
 
 logger = logging.getLogger(__name__)
 
+_DEFAULT_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "default_templates.json")
+
 
 def init_db():
     """Create all main app tables if they don't exist, run idempotent migrations."""
@@ -167,66 +174,80 @@ def init_db():
             )
         """)
 
+        # Write-behind queue for GitHub section writes (storage_outbox.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS storage_outbox (
+                id BIGSERIAL PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                prompt_id TEXT NOT NULL,
+                op TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TEXT NOT NULL,
+                claimed_at TEXT,
+                last_error TEXT,
+                created_at TEXT
+            )
+        """)
+
+        # Indexes for the per-request lookups. users(id/email/github_id) and the
+        # variable tables' (owner, ...) prefixes are already served by their
+        # PRIMARY KEY / UNIQUE constraints: UNIQUE(user_id, name) and
+        # UNIQUE(prompt_id, version, name) back the variable routes' equality
+        # lookups, their ON CONFLICT targets and the ORDER BY name listings, so
+        # no separate index is created for them.
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_settings_user_id ON settings (user_id)")
+        # Signup's "username taken" probe. Not UNIQUE: GitHub logins are synced
+        # as-is and may collide with existing password accounts.
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users (username)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_prompts_user_updated ON prompts (user_id, updated_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_prompt_versions_prompt_created ON prompt_versions (prompt_id, created_at)")
+        # Key digests are unique by construction; enforce it so a lookup can
+        # only ever match one key. A savepoint keeps boot alive if legacy data
+        # holds duplicates (the plain index then stays in place).
+        cursor.execute("SAVEPOINT api_keys_key_hash_unique")
+        try:
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_api_keys_key_hash_unique ON api_keys (key_hash)")
+            cursor.execute("DROP INDEX IF EXISTS idx_api_keys_key_hash")
+            cursor.execute("RELEASE SAVEPOINT api_keys_key_hash_unique")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT api_keys_key_hash_unique")
+            logger.warning(f"api_keys.key_hash has duplicates; keeping non-unique index: {e}")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_api_keys_key_hash ON api_keys (key_hash)")
+        # create_version's duplicate-branch check, and the per-user key list
+        # ordered by created_at (no sort step).
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_prompt_versions_prompt_branch ON prompt_versions (prompt_id, branch_name)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_api_keys_user_created ON api_keys (user_id, created_at DESC)")
+        # Outbox claim: due rows by status, and the per-prompt ordering probe.
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_storage_outbox_status_due ON storage_outbox (status, next_attempt_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_storage_outbox_prompt ON storage_outbox (prompt_id, id)")
+
         # Seed default templates only if empty
         cursor.execute("SELECT COUNT(*) FROM templates")
         if cursor.fetchone()["count"] == 0:
             _seed_templates(cursor)
 
 
+def _load_default_templates() -> list:
+    """Read the bundled default template definitions (only needed on first boot)."""
+    with open(_DEFAULT_TEMPLATES_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
 def _seed_templates(cursor):
     """Insert the four default prompt templates."""
     now = datetime.now(timezone.utc).isoformat()
-    default_templates = [
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Agent Persona",
-            "description": "Complete AI agent persona with identity, context, and capabilities",
-            "sections": json.dumps([
-                {"order": 1, "name": "identity", "title": "Identity", "content": "# Identity\n\nYou are {{agent_name}}, a {{agent_role}}.\n\n## Core Traits\n- Professional and helpful\n- Clear and concise communication\n- Empathetic and understanding"},
-                {"order": 2, "name": "context", "title": "Context", "content": "# Context\n\n## Company: {{company_name}}\n\n{{company_description}}\n\n## Your Role\nYou serve as the primary point of contact for {{use_case}}."},
-                {"order": 3, "name": "role", "title": "Role & Responsibilities", "content": "# Role & Responsibilities\n\n## Primary Responsibilities\n1. Assist users with their inquiries\n2. Provide accurate information\n3. Escalate complex issues when necessary\n\n## Boundaries\n- Never share confidential information\n- Stay within your area of expertise"},
-                {"order": 4, "name": "skills", "title": "Skills & Capabilities", "content": "# Skills & Capabilities\n\n## Core Skills\n- Natural language understanding\n- Context retention\n- Multi-turn conversation\n\n## Tools Available\n{{#tools}}\n- {{name}}: {{description}}\n{{/tools}}"},
-                {"order": 5, "name": "guidelines", "title": "Operating Guidelines", "content": "# Operating Guidelines\n\n## Communication Style\n- Tone: {{tone}}\n- Language: {{language}}\n\n## Response Format\n- Keep responses concise but complete\n- Use formatting for clarity\n- Ask clarifying questions when needed"},
-            ]),
-            "created_at": now,
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Task Executor",
-            "description": "Focused task execution agent with clear instructions",
-            "sections": json.dumps([
-                {"order": 1, "name": "objective", "title": "Objective", "content": "# Objective\n\nYour primary objective is to {{task_objective}}.\n\n## Success Criteria\n{{success_criteria}}"},
-                {"order": 2, "name": "instructions", "title": "Instructions", "content": "# Instructions\n\n## Step-by-Step Process\n1. Analyze the input\n2. Plan your approach\n3. Execute the task\n4. Validate results\n\n## Constraints\n{{constraints}}"},
-                {"order": 3, "name": "output", "title": "Output Format", "content": "# Output Format\n\n## Expected Output\n{{output_format}}\n\n## Examples\n{{#examples}}\n### Example {{index}}\nInput: {{input}}\nOutput: {{output}}\n{{/examples}}"},
-            ]),
-            "created_at": now,
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Knowledge Expert",
-            "description": "Domain-specific knowledge base agent",
-            "sections": json.dumps([
-                {"order": 1, "name": "domain", "title": "Domain Expertise", "content": "# Domain Expertise\n\nYou are an expert in {{domain}}.\n\n## Knowledge Areas\n{{#knowledge_areas}}\n- {{name}}\n{{/knowledge_areas}}"},
-                {"order": 2, "name": "wisdom", "title": "Trade Knowledge", "content": "# Trade Knowledge & Wisdom\n\n## Best Practices\n{{best_practices}}\n\n## Common Pitfalls\n{{common_pitfalls}}\n\n## Lessons Learned\n{{lessons_learned}}"},
-                {"order": 3, "name": "responses", "title": "Response Guidelines", "content": "# Response Guidelines\n\n## When answering questions:\n1. Draw from your expertise\n2. Provide practical examples\n3. Cite sources when applicable\n\n## Handling uncertainty:\n- Acknowledge limitations\n- Suggest alternatives\n- Recommend expert consultation when needed"},
-            ]),
-            "created_at": now,
-        },
-        {
-            "id": str(uuid.uuid4()),
-            "name": "Minimal Prompt",
-            "description": "Simple single-section prompt for quick tasks",
-            "sections": json.dumps([
-                {"order": 1, "name": "prompt", "title": "Main Prompt", "content": "# {{title}}\n\n{{instructions}}\n\n## Input\n{{input}}\n\n## Output\nProvide your response below:"},
-            ]),
-            "created_at": now,
-        },
+    rows = [
+        (str(uuid.uuid4()), t["name"], t["description"], orjson.dumps(t["sections"]).decode(), now)
+        for t in _load_default_templates()
     ]
-    for t in default_templates:
-        cursor.execute(
-            "INSERT INTO templates (id, name, description, sections, created_at) VALUES (%s, %s, %s, %s, %s)",
-            (t["id"], t["name"], t["description"], t["sections"], t["created_at"]),
-        )
+    # One multi-row INSERT; psycopg2's executemany would round-trip per row
+    execute_values(
+        cursor,
+        "INSERT INTO templates (id, name, description, sections, created_at) VALUES %s",
+        rows,
+    )
 
 
 def seed_admin_user():
@@ -25,6 +25,8 @@ from typing import Any
 
 from fastapi import Header, HTTPException
 
+from core.utils import secret_equals
+
 logger = logging.getLogger(__name__)
 
 
@@ -154,10 +156,10 @@ async def verify_mcp_service_key(
             detail="MCP service key not configured on server",
         )
 
-    if x_api_key and x_api_key == _MCP_SERVICE_KEY:
+    if secret_equals(x_api_key, _MCP_SERVICE_KEY):
         return {"id": "mcp-service", "auth": "x-api-key"}
 
-    if authorization and authorization == f"Bearer {_MCP_SERVICE_KEY}":
+    if secret_equals(authorization, f"Bearer {_MCP_SERVICE_KEY}"):
         return {"id": "mcp-service", "auth": "bearer"}
 
     raise HTTPException(status_code=401, detail="Invalid or missing MCP credentials")
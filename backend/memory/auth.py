@@ -17,7 +17,7 @@ from fastapi import Header, HTTPException
 
 from core.auth import require_admin_auth  # noqa: F401
 from core.storage import get_memory_db_context
-from core.utils import utcnow
+from core.utils import secret_equals, utcnow
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +28,7 @@ async def verify_agent_key(x_api_key: str = Header(None, alias="X-API-Key")) ->
     """Verify agent API key and return agent info."""
     if not x_api_key:
         raise HTTPException(status_code=401, detail="API key required")
-    if _MCP_SERVICE_KEY and x_api_key == _MCP_SERVICE_KEY:
+    if secret_equals(x_api_key, _MCP_SERVICE_KEY):
         return {"id": "mcp-service", "name": "MCP Service", "entity_type": "mcp"}
 
     import hashlib
@@ -4,7 +4,6 @@ routes/api_keys.py — API key management endpoints
 import secrets
 import logging
 import uuid
-from datetime import datetime, timezone
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -12,6 +11,7 @@ from pydantic import BaseModel
 
 from core.db import get_db_context
 from core.auth import hash_api_key, require_auth
+from core.utils import utcnow
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -42,7 +42,7 @@ class APIKeyCreateResponse(APIKeyResponse):
 # ─────────────────────────────────────────────
 
 @router.get("/keys", response_model=List[APIKeyResponse])
-async def get_api_keys(user: dict = Depends(require_auth)):
+def get_api_keys(user: dict = Depends(require_auth)):
     with get_db_context() as conn:
         cursor = conn.cursor()
         if user.get("is_admin"):
@@ -61,11 +61,11 @@ async def get_api_keys(user: dict = Depends(require_auth)):
 
 
 @router.post("/keys", response_model=APIKeyCreateResponse)
-async def create_api_key(key_data: APIKeyCreate, user: dict = Depends(require_auth)):
+def create_api_key(key_data: APIKeyCreate, user: dict = Depends(require_auth)):
     key_id = str(uuid.uuid4())
     full_key = f"pm_{secrets.token_urlsafe(32)}"
     key_preview = f"{full_key[:7]}...{full_key[-4:]}"
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     with get_db_context() as conn:
         cursor = conn.cursor()
         cursor.execute(
@@ -78,7 +78,7 @@ async def create_api_key(key_data: APIKeyCreate, user: dict = Depends(require_au
 
 
 @router.delete("/keys/{key_id}")
-async def delete_api_key(key_id: str, user: dict = Depends(require_auth)):
+def delete_api_key(key_id: str, user: dict = Depends(require_auth)):
     with get_db_context() as conn:
         cursor = conn.cursor()
         if user.get("is_admin"):
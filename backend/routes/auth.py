@@ -3,6 +3,7 @@ routes/auth.py — Authentication endpoints
 
 Handles: signup, login, GitHub OAuth flow, auth status, logout.
 """
+import asyncio
 import os
 import secrets
 import hashlib
@@ -12,18 +13,20 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional
 from urllib.parse import urlencode
 
-import httpx
 from fastapi import APIRouter, Depends, Header, HTTPException, Request
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from pydantic import BaseModel
 
 from core.auth import (
-    hash_password, verify_password,
-    create_access_token, get_current_user, SECRET_KEY, ALGORITHM,
+    hash_password_async, verify_password_async, verify_dummy_password_async, password_needs_rehash,
+    create_access_token, get_current_user, SECRET_KEY, ALGORITHM, USER_COLUMNS,
 )
 from core.secrets import encrypt_secret
 from core.db import get_db_context
+from core.github import github_paginate, github_request
+from core.http import get_http_client
 from core.storage import get_redis_client
+from core.utils import utcnow
 from jose import jwt, JWTError
 
 logger = logging.getLogger(__name__)
@@ -34,6 +37,7 @@ GITHUB_CLIENT_ID = os.environ.get("GITHUB_CLIENT_ID", "")
 GITHUB_CLIENT_SECRET = os.environ.get("GITHUB_CLIENT_SECRET", "")
 GITHUB_REDIRECT_URI = os.environ.get("GITHUB_REDIRECT_URI", "")
 FRONTEND_URL = os.environ.get("FRONTEND_URL", "http://localhost:3000")
+GITHUB_AUTHORIZE_URL = "https://github.com/login/oauth/authorize"
 
 
 # ─────────────────────────────────────────────
@@ -78,31 +82,29 @@ class AuthResponse(BaseModel):
 # Helpers
 # ─────────────────────────────────────────────
 
+def _user_payload(user: dict) -> dict:
+    """The UserResponse fields as a plain dict."""
+    return {
+        "id": user["id"],
+        "github_id": user.get("github_id"),
+        "username": user["username"],
+        "email": user.get("email"),
+        "avatar_url": user.get("avatar_url"),
+        "github_url": user.get("github_url"),
+        "plan": user.get("plan", "free"),
+        "is_admin": bool(user.get("is_admin", False)),
+        "created_at": user["created_at"],
+        "updated_at": user["updated_at"],
+    }
+
+
 def user_to_response(user: dict) -> UserResponse:
-    return UserResponse(
-        id=user["id"],
-        github_id=user.get("github_id"),
-        username=user["username"],
-        email=user.get("email"),
-        avatar_url=user.get("avatar_url"),
-        github_url=user.get("github_url"),
-        plan=user.get("plan", "free"),
-        is_admin=bool(user.get("is_admin", False)),
-        created_at=user["created_at"],
-        updated_at=user["updated_at"],
-    )
+    return UserResponse(**_user_payload(user))
 
 
-# ─────────────────────────────────────────────
-# Endpoints
-# ─────────────────────────────────────────────
+# Blocking DB helpers; the async endpoints run them via asyncio.to_thread.
 
-@router.post("/auth/signup", response_model=AuthResponse)
-async def signup(user_data: UserCreate):
-    """Register a new user with email/password."""
-    if os.environ.get("ALLOW_PUBLIC_SIGNUP", "true").lower() not in {"1", "true", "yes"}:
-        raise HTTPException(status_code=403, detail="Public signup is disabled")
-    now = datetime.now(timezone.utc).isoformat()
+def _insert_password_user(user_data: UserCreate, password_hash: str, now: str) -> dict:
     with get_db_context() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT id FROM users WHERE email = %s", (user_data.email,))
@@ -112,15 +114,67 @@ async def signup(user_data: UserCreate):
         if cursor.fetchone():
             raise HTTPException(status_code=400, detail="Username already taken")
         user_id = str(uuid.uuid4())
-        password_hash = hash_password(user_data.password)
         cursor.execute(
             """INSERT INTO users (id, username, email, password_hash, plan, created_at, updated_at)
                VALUES (%s, %s, %s, %s, 'free', %s, %s)""",
             (user_id, user_data.username, user_data.email, password_hash, now, now),
         )
-        cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-        user = dict(cursor.fetchone())
-    token = create_access_token(data={"sub": user_id})
+        cursor.execute(f"SELECT {USER_COLUMNS} FROM users WHERE id = %s", (user_id,))
+        return dict(cursor.fetchone())
+
+
+def _get_user_by_email(email: str) -> Optional[dict]:
+    with get_db_context() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {USER_COLUMNS}, password_hash FROM users WHERE email = %s", (email,))
+        return cursor.fetchone()
+
+
+def _store_upgraded_hash(user_id: str, upgraded_hash: str, now: str) -> None:
+    with get_db_context() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE users SET password_hash = %s, updated_at = %s WHERE id = %s",
+            (upgraded_hash, now, user_id),
+        )
+
+
+def _upsert_github_user(github_user: dict, primary_email: Optional[str], github_token: str, now: str) -> str:
+    with get_db_context() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM users WHERE github_id = %s", (github_user["id"],))
+        existing = cursor.fetchone()
+        if existing:
+            user_id = existing["id"]
+            cursor.execute(
+                "UPDATE users SET username=%s, email=%s, avatar_url=%s, github_token=%s, updated_at=%s WHERE id=%s",
+                (github_user["login"], primary_email, github_user.get("avatar_url"), encrypt_secret(github_token), now, user_id),
+            )
+        else:
+            user_id = str(uuid.uuid4())
+            cursor.execute(
+                """INSERT INTO users (id, github_id, username, email, avatar_url, github_url, github_token, plan, created_at, updated_at)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, 'free', %s, %s)""",
+                (user_id, github_user["id"], github_user["login"], primary_email,
+                 github_user.get("avatar_url"), github_user.get("html_url"), encrypt_secret(github_token), now, now),
+            )
+        return user_id
+
+
+# ─────────────────────────────────────────────
+# Endpoints
+# ─────────────────────────────────────────────
+
+@router.post("/auth/signup", response_model=AuthResponse)
+async def signup(user_data: UserCreate):
+    """Register a new user with email/password."""
+    if os.environ.get("ALLOW_PUBLIC_SIGNUP", "true").lower() not in {"1", "true", "yes"}:
+        raise HTTPException(status_code=403, detail="Public signup is disabled")
+    now = utcnow()
+    # Hash before borrowing a pooled connection so it is not held for the KDF.
+    password_hash = await hash_password_async(user_data.password)
+    user = await asyncio.to_thread(_insert_password_user, user_data, password_hash, now)
+    token = create_access_token(data={"sub": user["id"]})
     return AuthResponse(token=token, user=user_to_response(user))
 
 
@@ -141,21 +195,23 @@ async def login(credentials: UserLogin, request: Request):
         raise
     except Exception:
         redis = None
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE email = %s", (credentials.email,))
-        user = cursor.fetchone()
-        if not user:
-            logger.warning(f"Login failed: user not found for email {credentials.email}")
-            raise HTTPException(status_code=401, detail="Invalid email or password")
-        user = dict(user)
-        if not user.get("password_hash"):
-            raise HTTPException(status_code=401, detail="This account uses GitHub login. Please sign in with GitHub.")
-        if not verify_password(credentials.password, user["password_hash"]):
-            logger.warning(f"Login failed: password mismatch for email {credentials.email}")
-            raise HTTPException(status_code=401, detail="Invalid email or password")
-        now = datetime.now(timezone.utc).isoformat()
-        cursor.execute("UPDATE users SET updated_at = %s WHERE id = %s", (now, user["id"]))
+    user = await asyncio.to_thread(_get_user_by_email, credentials.email)
+    if not user:
+        await verify_dummy_password_async(credentials.password)
+        logger.warning(f"Login failed: user not found for email {credentials.email}")
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    user = dict(user)
+    if not user.get("password_hash"):
+        await verify_dummy_password_async(credentials.password)
+        raise HTTPException(status_code=401, detail="This account uses GitHub login. Please sign in with GitHub.")
+    if not await verify_password_async(credentials.password, user["password_hash"]):
+        logger.warning(f"Login failed: password mismatch for email {credentials.email}")
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    # A plain login writes nothing (updated_at tracks profile changes); only a
+    # legacy or outdated hash is rewritten.
+    if password_needs_rehash(user["password_hash"]):
+        upgraded_hash = await hash_password_async(credentials.password)
+        await asyncio.to_thread(_store_upgraded_hash, user["id"], upgraded_hash, utcnow())
     logger.info(f"Successful login for user: {credentials.email}")
     if redis is not None:
         try:
@@ -183,14 +239,13 @@ async def github_login():
         SECRET_KEY,
         algorithm=ALGORITHM,
     )
-    auth_url = (
-        f"https://github.com/login/oauth/authorize?"
-        f"client_id={GITHUB_CLIENT_ID}&"
-        f"redirect_uri={GITHUB_REDIRECT_URI}&"
-        f"scope=user:email,repo&"
-        f"state={state}"
-    )
-    return {"auth_url": auth_url}
+    params = {
+        "client_id": GITHUB_CLIENT_ID,
+        "redirect_uri": GITHUB_REDIRECT_URI,
+        "scope": "user:email,repo",
+        "state": state,
+    }
+    return {"auth_url": f"{GITHUB_AUTHORIZE_URL}?{urlencode(params)}"}
 
 
 @router.get("/auth/github/callback")
@@ -207,48 +262,31 @@ async def github_callback(code: str, state: str = None):
     except JWTError:
         raise HTTPException(status_code=400, detail="Invalid or expired OAuth state")
     try:
-        async with httpx.AsyncClient() as client:
-            token_resp = await client.post(
-                "https://github.com/login/oauth/access_token",
-                data={"client_id": GITHUB_CLIENT_ID, "client_secret": GITHUB_CLIENT_SECRET, "code": code},
-                headers={"Accept": "application/json"},
-            )
-            token_data = token_resp.json()
+        client = get_http_client()
+        token_resp = await client.post(
+            "https://github.com/login/oauth/access_token",
+            data={"client_id": GITHUB_CLIENT_ID, "client_secret": GITHUB_CLIENT_SECRET, "code": code},
+            headers={"Accept": "application/json"},
+        )
+        token_data = token_resp.json()
         github_token = token_data.get("access_token")
         if not github_token:
             error = token_data.get("error_description", "Failed to get access token")
             return RedirectResponse(url=f"{FRONTEND_URL}/auth/callback?{urlencode({'error': error})}")
 
-        async with httpx.AsyncClient() as client:
-            gh_headers = {"Authorization": f"Bearer {github_token}", "Accept": "application/json"}
-            user_resp = await client.get("https://api.github.com/user", headers=gh_headers)
-            github_user = user_resp.json()
-            emails_resp = await client.get("https://api.github.com/user/emails", headers=gh_headers)
-            emails = emails_resp.json()
+        gh_headers = {"Authorization": f"Bearer {github_token}", "Accept": "application/json"}
+        user_resp, emails = await asyncio.gather(
+            github_request("GET", "/user", gh_headers),
+            github_paginate("/user/emails", gh_headers),
+        )
+        github_user = user_resp.json()
 
         primary_email = next((e.get("email") for e in emails if e.get("primary")), None)
         if not primary_email and emails:
             primary_email = emails[0].get("email")
 
-        now = datetime.now(timezone.utc).isoformat()
-        with get_db_context() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM users WHERE github_id = %s", (github_user["id"],))
-            existing = cursor.fetchone()
-            if existing:
-                user_id = existing["id"]
-                cursor.execute(
-                    "UPDATE users SET username=%s, email=%s, avatar_url=%s, github_token=%s, updated_at=%s WHERE id=%s",
-                    (github_user["login"], primary_email, github_user.get("avatar_url"), encrypt_secret(github_token), now, user_id),
-                )
-            else:
-                user_id = str(uuid.uuid4())
-                cursor.execute(
-                    """INSERT INTO users (id, github_id, username, email, avatar_url, github_url, github_token, plan, created_at, updated_at)
-                       VALUES (%s, %s, %s, %s, %s, %s, %s, 'free', %s, %s)""",
-                    (user_id, github_user["id"], github_user["login"], primary_email,
-                     github_user.get("avatar_url"), github_user.get("html_url"), encrypt_secret(github_token), now, now),
-                )
+        now = utcnow()
+        user_id = await asyncio.to_thread(_upsert_github_user, github_user, primary_email, github_token, now)
         jwt_token = create_access_token(data={"sub": user_id})
         return RedirectResponse(url=f"{FRONTEND_URL}/auth/callback?{urlencode({'token': jwt_token})}")
     except Exception as e:
@@ -259,9 +297,11 @@ async def github_callback(code: str, state: str = None):
 @router.get("/auth/status", response_model=AuthStatusResponse)
 async def auth_status(user: dict = Depends(get_current_user)):
     """Check authentication status."""
+    # Polled on every page load: serialised straight from the user row with
+    # orjson; response_model stays for the OpenAPI schema.
     if not user:
-        return AuthStatusResponse(authenticated=False)
-    return AuthStatusResponse(authenticated=True, user=user_to_response(user))
+        return ORJSONResponse({"authenticated": False, "user": None})
+    return ORJSONResponse({"authenticated": True, "user": _user_payload(user)})
 
 
 @router.post("/auth/logout")
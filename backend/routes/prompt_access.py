@@ -1,13 +1,54 @@
 """Shared prompt ownership checks used by prompt-adjacent routers."""
+from typing import Optional
+
 from fastapi import HTTPException
 
+from core.cache import TTLCache
+from core.db import get_db_context
+
+# prompt_id -> {"user_id", "folder_path"}. Neither column changes after the
+# prompt is inserted, so entries only need dropping when the prompt is deleted.
+# The cache is per worker: forget_prompt_location only clears the worker that
+# handled the delete, and with WEB_CONCURRENCY > 1 the others keep resolving a
+# deleted prompt (render, section reads) until the entry expires. The short TTL
+# keeps that window to a few seconds while still absorbing bursts of reads.
+_prompt_locations = TTLCache(maxsize=4096, ttl=5)
+
 
 def require_prompt_owner(cursor, prompt_id: str, user_id: str) -> dict:
+    """Raise 404 unless user_id owns prompt_id; returns the prompt's id and folder_path."""
     cursor.execute(
-        "SELECT * FROM prompts WHERE id = %s AND user_id = %s",
+        "SELECT id, folder_path FROM prompts WHERE id = %s AND user_id = %s",
         (prompt_id, user_id),
     )
     row = cursor.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Prompt not found")
     return dict(row)
+
+
+def get_prompt_location(prompt_id: str) -> Optional[dict]:
+    """The prompt's owner and storage folder, cached per worker; None if it does not exist."""
+    location = _prompt_locations.get(prompt_id)
+    if location is None:
+        with get_db_context() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT user_id, folder_path FROM prompts WHERE id = %s", (prompt_id,))
+            row = cursor.fetchone()
+        if not row:
+            return None
+        location = dict(row)
+        _prompt_locations.set(prompt_id, location)
+    return location
+
+
+def require_prompt_folder(prompt_id: str, user_id: str) -> str:
+    """Raise 404 unless user_id owns prompt_id; returns its folder_path (cached)."""
+    location = get_prompt_location(prompt_id)
+    if not location or location["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return location["folder_path"]
+
+
+def forget_prompt_location(prompt_id: str) -> None:
+    _prompt_locations.pop(prompt_id)
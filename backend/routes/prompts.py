@@ -8,18 +8,21 @@ Handles: prompt list/create/get/update/delete,
 Shared helpers (slugify, extract_variables) are defined here and re-exported so
 routes/render.py can import them without circular dependencies.
 """
-import json
+import asyncio
 import logging
 import re
 import uuid
-from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from core.auth import require_auth
 from core.db import get_db_context, get_github_settings
+from core.utils import utcnow
+from routes.prompt_access import forget_prompt_location, require_prompt_folder
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -42,6 +45,10 @@ class PromptMarkdownImport(BaseModel):
     markdown: str
 
 
+_FRONTMATTER_RE = re.compile(r"^---\s*\n(.*?)\n---\s*\n?(.*)$", re.DOTALL)
+_SECTION_HEADING_RE = re.compile(r"^## (.+)$", re.MULTILINE)
+
+
 def _parse_prompt_markdown(markdown: str):
     """Parse a prompt markdown file into (metadata, sections).
 
@@ -53,7 +60,7 @@ def _parse_prompt_markdown(markdown: str):
     text = markdown.lstrip("\n")
     body = text
     if text.startswith("---"):
-        m = re.match(r"^---\s*\n(.*?)\n---\s*\n?(.*)$", text, re.DOTALL)
+        m = _FRONTMATTER_RE.match(text)
         if m:
             frontmatter, body = m.group(1), m.group(2)
             for line in frontmatter.splitlines():
@@ -62,7 +69,7 @@ def _parse_prompt_markdown(markdown: str):
                     meta[key.strip().lower()] = value.strip()
 
     sections: List[Dict[str, Any]] = []
-    chunks = re.split(r"^## (.+)$", body, flags=re.MULTILINE)
+    chunks = _SECTION_HEADING_RE.split(body)
     if len(chunks) > 1:
         i = 1
         while i < len(chunks):
@@ -118,11 +125,126 @@ class VersionCreate(BaseModel):
 # Helpers
 # ─────────────────────────────────────────────
 
+# One pass over runs of non-word characters: a run becomes "_" if it holds any
+# whitespace or hyphen and vanishes otherwise — the same result as stripping
+# [^\w\s-] and then collapsing [-\s]+ runs, without the intermediate string.
+_SLUG_RUN_RE = re.compile(r"\W+")
+
+# Section files are stored as "<order>_<name>.md".
+_SECTION_FILENAME_RE = re.compile(r"^(\d+)_(.+)\.md$")
+
+
+def _slug_run(match: re.Match) -> str:
+    run = match.group()
+    return "_" if "-" in run or any(c.isspace() for c in run) else ""
+
+
 def slugify(text: str) -> str:
-    text = text.lower().strip()
-    text = re.sub(r"[^\w\s-]", "", text)
-    text = re.sub(r"[-\s]+", "_", text)
-    return text
+    return _SLUG_RUN_RE.sub(_slug_run, text.lower().strip())
+
+
+FREE_PLAN_PROMPT_LIMIT = 1
+_PROMPT_LIMIT_DETAIL = "Free plan limited to 1 prompt. Upgrade to Pro for unlimited prompts."
+_PROMPT_EXISTS_DETAIL = "A prompt with this name already exists"
+
+# The quota is enforced by the INSERT itself, under a per-user transaction
+# lock so two concurrent creates cannot both pass the count.
+_INSERT_PROMPT_WITHIN_LIMIT = (
+    "INSERT INTO prompts (id, user_id, name, description, folder_path, created_at, updated_at) "
+    "SELECT %s,%s,%s,%s,%s,%s,%s WHERE (SELECT COUNT(*) FROM prompts WHERE user_id = %s) < %s"
+)
+
+
+def _prompt_limit(user: dict) -> Optional[int]:
+    return FREE_PLAN_PROMPT_LIMIT if user.get("plan") == "free" else None
+
+
+def _check_prompt_limit(cursor, user: dict) -> None:
+    """Fail fast, before any storage write, when the plan's prompt quota is used up."""
+    limit = _prompt_limit(user)
+    if limit is None:
+        return
+    cursor.execute("SELECT COUNT(*) AS count FROM prompts WHERE user_id = %s", (user["id"],))
+    if cursor.fetchone()["count"] >= limit:
+        raise HTTPException(status_code=403, detail=_PROMPT_LIMIT_DETAIL)
+
+
+def _insert_prompt_rows(
+    prompt_id: str, user_id: str, name: str, description: str, folder_path: str, now: str, limit: Optional[int] = None
+) -> str:
+    """Insert the prompt and its default v1 version in one transaction. Returns the version id.
+
+    With a limit, raises 403 instead of inserting once the user already owns that many prompts.
+    """
+    version_id = str(uuid.uuid4())
+    with get_db_context() as conn:
+        cursor = conn.cursor()
+        if limit is None:
+            cursor.execute(
+                "INSERT INTO prompts (id, user_id, name, description, folder_path, created_at, updated_at) VALUES (%s,%s,%s,%s,%s,%s,%s)",
+                (prompt_id, user_id, name, description, folder_path, now, now),
+            )
+        else:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"prompt_quota:{user_id}",))
+            cursor.execute(
+                _INSERT_PROMPT_WITHIN_LIMIT,
+                (prompt_id, user_id, name, description, folder_path, now, now, user_id, limit),
+            )
+            if cursor.rowcount == 0:
+                raise HTTPException(status_code=403, detail=_PROMPT_LIMIT_DETAIL)
+        cursor.execute(
+            "INSERT INTO prompt_versions (id, prompt_id, version_name, branch_name, is_default, created_at) VALUES (%s,%s,%s,%s,TRUE,%s)",
+            (version_id, prompt_id, "v1", "v1", now),
+        )
+    return version_id
+
+
+async def _commit_prompt_rows(
+    storage_service, prompt_id: str, user: dict, name: str, description: str, folder_path: str, now: str
+) -> str:
+    """Insert the rows for a prompt already written to storage; undo the storage write if that fails.
+
+    Deleting folder_path is safe because storage create_prompt refuses a
+    folder that already exists, so it was created by this request.
+    """
+    try:
+        return await asyncio.to_thread(
+            _insert_prompt_rows, prompt_id, user["id"], name, description, folder_path, now, _prompt_limit(user)
+        )
+    except Exception:
+        try:
+            await storage_service.delete_prompt(folder_path)
+        except Exception as e:
+            logger.warning(f"Failed to remove storage for rejected prompt {folder_path}: {e}")
+        raise
+
+
+def _touch_prompt(cursor, prompt_id: str, user_id: str) -> str:
+    """Bump updated_at for a section change and return the folder_path, in one statement.
+
+    Runs before the storage write, so no second transaction is needed after
+    it; a failed write leaves updated_at slightly ahead, which is harmless.
+    The UPDATE also row-locks the prompt until the caller's transaction ends.
+    """
+    cursor.execute(
+        "UPDATE prompts SET updated_at = %s WHERE id = %s AND user_id = %s RETURNING folder_path",
+        (utcnow(), prompt_id, user_id),
+    )
+    row = cursor.fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return row["folder_path"]
+
+
+def _queue_section_write(cursor, user_id: str, prompt_id: str, op: str, payload: dict) -> JSONResponse:
+    """Queue a write-behind storage op on the caller's cursor (same transaction as _touch_prompt); 202 reply."""
+    from storage_outbox import enqueue_storage_write
+
+    outbox_id = enqueue_storage_write(cursor, user_id, prompt_id, op, payload)
+    body = {"status": "queued", "outbox_id": outbox_id}
+    if "filename" in payload:
+        body["filename"] = payload["filename"]
+    return JSONResponse(status_code=202, content=body)
 
 
 from services.prompt_renderer import extract_variables, inject_variables
@@ -132,34 +254,48 @@ from services.prompt_renderer import extract_variables, inject_variables
 # Prompt Endpoints
 # ─────────────────────────────────────────────
 
+# Versions are aggregated per prompt in the same round trip (served by
+# idx_prompt_versions_prompt_created) instead of one query per prompt.
+_VERSIONS_JSON = (
+    "COALESCE((SELECT json_agg(v ORDER BY v.created_at) "
+    "FROM prompt_versions v WHERE v.prompt_id = p.id), '[]'::json) AS versions"
+)
+_SELECT_USER_PROMPTS_WITH_VERSIONS = (
+    f"SELECT p.*, {_VERSIONS_JSON} FROM prompts p WHERE p.user_id = %s ORDER BY p.updated_at DESC"
+)
+_SELECT_PROMPT_WITH_VERSIONS = f"SELECT p.*, {_VERSIONS_JSON} FROM prompts p WHERE p.id = %s AND p.user_id = %s"
+# One fixed statement for every field combination: a NULL leaves the column
+# as it is (an empty name is ignored, as before), and the owner check is the
+# WHERE. RETURNING gives the same shape as get_prompt, so no re-read is needed.
+_UPDATE_PROMPT = (
+    "UPDATE prompts AS p SET name = COALESCE(%s, name), description = COALESCE(%s, description), updated_at = %s "
+    f"WHERE p.id = %s AND p.user_id = %s RETURNING p.*, {_VERSIONS_JSON}"
+)
+
 @router.get("/prompts")
-async def get_prompts(user: dict = Depends(require_auth)):
+def get_prompts(user: dict = Depends(require_auth)):
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM prompts WHERE user_id = %s ORDER BY updated_at DESC", (user["id"],))
-        prompts = [dict(row) for row in cursor.fetchall()]
-        for prompt in prompts:
-            cursor.execute("SELECT * FROM prompt_versions WHERE prompt_id = %s ORDER BY created_at", (prompt["id"],))
-            prompt["versions"] = [dict(v) for v in cursor.fetchall()]
-    return prompts
+        cursor.execute(_SELECT_USER_PROMPTS_WITH_VERSIONS, (user["id"],))
+        return [dict(row) for row in cursor.fetchall()]
 
 
 @router.post("/prompts", response_model=PromptResponse)
 async def create_prompt(prompt_data: PromptCreate, user: dict = Depends(require_auth)):
     from storage_service import get_storage_service, get_storage_mode
 
+    sections_to_create = []
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) as count FROM prompts WHERE user_id = %s", (user["id"],))
-        count = cursor.fetchone()["count"]
-        if user.get("plan") == "free" and count >= 1:
-            raise HTTPException(
-                status_code=403,
-                detail="Free plan limited to 1 prompt. Upgrade to Pro for unlimited prompts.",
-            )
+        _check_prompt_limit(cursor, user)
+        if prompt_data.template_id:
+            cursor.execute("SELECT sections FROM templates WHERE id = %s", (prompt_data.template_id,))
+            t = cursor.fetchone()
+            if t:
+                sections_to_create = orjson.loads(t["sections"])
 
     prompt_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     prompt_slug = slugify(prompt_data.name)
     folder_path = f"prompts/{prompt_slug}"
 
@@ -169,15 +305,6 @@ async def create_prompt(prompt_data: PromptCreate, user: dict = Depends(require_
         if not settings or not settings.get("github_token"):
             storage_mode = "local"
 
-    sections_to_create = []
-    if prompt_data.template_id:
-        with get_db_context() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT sections FROM templates WHERE id = %s", (prompt_data.template_id,))
-            t = cursor.fetchone()
-            if t:
-                sections_to_create = json.loads(t["sections"])
-
     sections = [
         {
             "filename": f"{str(s['order']).zfill(2)}_{s['name']}.md",
@@ -193,18 +320,9 @@ async def create_prompt(prompt_data: PromptCreate, user: dict = Depends(require_
             if v not in variables:
                 variables[v] = {"required": True}
 
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO prompts (id, user_id, name, description, folder_path, created_at, updated_at) VALUES (%s,%s,%s,%s,%s,%s,%s)",
-            (prompt_id, user["id"], prompt_data.name, prompt_data.description or "", folder_path, now, now),
-        )
-        version_id = str(uuid.uuid4())
-        cursor.execute(
-            "INSERT INTO prompt_versions (id, prompt_id, version_name, branch_name, is_default, created_at) VALUES (%s,%s,%s,%s,TRUE,%s)",
-            (version_id, prompt_id, "v1", "v1", now),
-        )
-
+    # Write storage first; the rows are only inserted once it has succeeded,
+    # so no connection is held across the network call. _commit_prompt_rows
+    # removes the folder again if the insert fails.
     try:
         storage_service = get_storage_service(user["id"])
         await storage_service.create_prompt(
@@ -214,13 +332,15 @@ async def create_prompt(prompt_data: PromptCreate, user: dict = Depends(require_
             sections=sections,
             variables=variables,
         )
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail=_PROMPT_EXISTS_DETAIL)
     except Exception as e:
-        with get_db_context() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM prompt_versions WHERE prompt_id = %s", (prompt_id,))
-            cursor.execute("DELETE FROM prompts WHERE id = %s", (prompt_id,))
         raise HTTPException(status_code=500, detail=f"Failed to create prompt: {e}")
 
+    version_id = await _commit_prompt_rows(
+        storage_service, prompt_id, user, prompt_data.name, prompt_data.description or "", folder_path, now
+    )
+
     return PromptResponse(
         id=prompt_id,
         name=prompt_data.name,
@@ -239,7 +359,10 @@ async def export_prompt_markdown(prompt_id: str, version: str = "v1", user: dict
 
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM prompts WHERE id = %s AND user_id = %s", (prompt_id, user["id"]))
+        cursor.execute(
+            "SELECT name, description, folder_path FROM prompts WHERE id = %s AND user_id = %s",
+            (prompt_id, user["id"]),
+        )
         row = cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Prompt not found")
@@ -255,7 +378,7 @@ async def export_prompt_markdown(prompt_id: str, version: str = "v1", user: dict
         content = await storage_service.get_prompt_content(folder_path, version)
         for section in (content or {}).get("sections", []):
             filename = section.get("filename", "")
-            m = re.match(r"^(\d+)_(.+)\.md$", filename)
+            m = _SECTION_FILENAME_RE.match(filename)
             sec_name = m.group(2) if m else filename.replace(".md", "") or "section"
             sections.append({"name": sec_name, "content": section.get("content", "")})
     except Exception as e:
@@ -285,17 +408,10 @@ async def import_prompt_markdown(data: PromptMarkdownImport, user: dict = Depend
         raise HTTPException(status_code=400, detail="No prompt content found in markdown")
 
     with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) as count FROM prompts WHERE user_id = %s", (user["id"],))
-        count = cursor.fetchone()["count"]
-        if user.get("plan") == "free" and count >= 1:
-            raise HTTPException(
-                status_code=403,
-                detail="Free plan limited to 1 prompt. Upgrade to Pro for unlimited prompts.",
-            )
+        _check_prompt_limit(conn.cursor(), user)
 
     prompt_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     # Unique folder per import so re-importing the same file never collides in storage.
     folder_path = f"prompts/{slugify(name)}-{prompt_id[:8]}"
 
@@ -320,18 +436,6 @@ async def import_prompt_markdown(data: PromptMarkdownImport, user: dict = Depend
             if v not in variables:
                 variables[v] = {"required": True}
 
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO prompts (id, user_id, name, description, folder_path, created_at, updated_at) VALUES (%s,%s,%s,%s,%s,%s,%s)",
-            (prompt_id, user["id"], name, description or "", folder_path, now, now),
-        )
-        version_id = str(uuid.uuid4())
-        cursor.execute(
-            "INSERT INTO prompt_versions (id, prompt_id, version_name, branch_name, is_default, created_at) VALUES (%s,%s,%s,%s,TRUE,%s)",
-            (version_id, prompt_id, "v1", "v1", now),
-        )
-
     try:
         storage_service = get_storage_service(user["id"])
         await storage_service.create_prompt(
@@ -341,13 +445,13 @@ async def import_prompt_markdown(data: PromptMarkdownImport, user: dict = Depend
             sections=sections,
             variables=variables,
         )
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail=_PROMPT_EXISTS_DETAIL)
     except Exception as e:
-        with get_db_context() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM prompt_versions WHERE prompt_id = %s", (prompt_id,))
-            cursor.execute("DELETE FROM prompts WHERE id = %s", (prompt_id,))
         raise HTTPException(status_code=500, detail=f"Failed to import prompt: {e}")
 
+    version_id = await _commit_prompt_rows(storage_service, prompt_id, user, name, description or "", folder_path, now)
+
     return PromptResponse(
         id=prompt_id,
         name=name,
@@ -360,38 +464,29 @@ async def import_prompt_markdown(data: PromptMarkdownImport, user: dict = Depend
 
 
 @router.get("/prompts/{prompt_id}")
-async def get_prompt(prompt_id: str, user: dict = Depends(require_auth)):
+def get_prompt(prompt_id: str, user: dict = Depends(require_auth)):
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM prompts WHERE id = %s AND user_id = %s", (prompt_id, user["id"]))
+        cursor.execute(_SELECT_PROMPT_WITH_VERSIONS, (prompt_id, user["id"]))
         row = cursor.fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Prompt not found")
-        prompt = dict(row)
-        cursor.execute("SELECT * FROM prompt_versions WHERE prompt_id = %s", (prompt_id,))
-        prompt["versions"] = [dict(v) for v in cursor.fetchall()]
-    return prompt
+    return dict(row)
 
 
 @router.put("/prompts/{prompt_id}")
-async def update_prompt(prompt_id: str, prompt_data: PromptUpdate, user: dict = Depends(require_auth)):
-    now = datetime.now(timezone.utc).isoformat()
+def update_prompt(prompt_id: str, prompt_data: PromptUpdate, user: dict = Depends(require_auth)):
+    now = utcnow()
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM prompts WHERE id = %s AND user_id = %s", (prompt_id, user["id"]))
-        if not cursor.fetchone():
+        cursor.execute(
+            _UPDATE_PROMPT,
+            (prompt_data.name or None, prompt_data.description, now, prompt_id, user["id"]),
+        )
+        row = cursor.fetchone()
+        if not row:
             raise HTTPException(status_code=404, detail="Prompt not found")
-        updates, params = [], []
-        if prompt_data.name:
-            updates.append("name = %s")
-            params.append(prompt_data.name)
-        if prompt_data.description is not None:
-            updates.append("description = %s")
-            params.append(prompt_data.description)
-        updates.append("updated_at = %s")
-        params.extend([now, prompt_id])
-        cursor.execute(f"UPDATE prompts SET {', '.join(updates)} WHERE id = %s", params)
-    return await get_prompt(prompt_id, user)
+    return dict(row)
 
 
 @router.delete("/prompts/{prompt_id}")
@@ -406,10 +501,13 @@ async def delete_prompt(prompt_id: str, user: dict = Depends(require_auth)):
             raise HTTPException(status_code=404, detail="Prompt not found")
         folder_path = row["folder_path"]
 
-        # Delete child records first (FK ordering)
+        # Delete child records first (FK ordering); queued storage writes
+        # would otherwise recreate files for a prompt that no longer exists.
+        cursor.execute("DELETE FROM storage_outbox WHERE prompt_id = %s AND status <> 'running'", (prompt_id,))
         cursor.execute("DELETE FROM prompt_variables WHERE prompt_id = %s", (prompt_id,))
         cursor.execute("DELETE FROM prompt_versions WHERE prompt_id = %s", (prompt_id,))
         cursor.execute("DELETE FROM prompts WHERE id = %s", (prompt_id,))
+    forget_prompt_location(prompt_id)
 
     # Clean up storage files (best-effort, don't fail the request)
     try:
@@ -429,13 +527,7 @@ async def delete_prompt(prompt_id: str, user: dict = Depends(require_auth)):
 async def get_prompt_sections(prompt_id: str, version: str = "v1", user: dict = Depends(require_auth)):
     from storage_service import get_storage_service
 
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT folder_path FROM prompts WHERE id = %s AND user_id = %s", (prompt_id, user["id"]))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        folder_path = row["folder_path"]
+    folder_path = require_prompt_folder(prompt_id, user["id"])
 
     try:
         storage_service = get_storage_service(user["id"])
@@ -445,7 +537,7 @@ async def get_prompt_sections(prompt_id: str, version: str = "v1", user: dict =
         sections = []
         for section in content.get("sections", []):
             filename = section.get("filename", "")
-            m = re.match(r"^(\d+)_(.+)\.md$", filename)
+            m = _SECTION_FILENAME_RE.match(filename)
             order = int(m.group(1)) if m else 99
             name = m.group(2) if m else filename.replace(".md", "")
             sections.append({
@@ -466,13 +558,7 @@ async def get_prompt_sections(prompt_id: str, version: str = "v1", user: dict =
 async def get_section_content(prompt_id: str, filename: str, version: str = "v1", user: dict = Depends(require_auth)):
     from storage_service import get_storage_service
 
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT folder_path FROM prompts WHERE id = %s AND user_id = %s", (prompt_id, user["id"]))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        folder_path = row["folder_path"]
+    folder_path = require_prompt_folder(prompt_id, user["id"])
 
     try:
         storage_service = get_storage_service(user["id"])
@@ -496,42 +582,48 @@ async def create_section(
     user: dict = Depends(require_auth),
 ):
     from storage_service import get_storage_service
+    from storage_outbox import apply_storage_write, next_section_order, write_behind_enabled
 
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT folder_path FROM prompts WHERE id = %s AND user_id = %s", (prompt_id, user["id"]))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        folder_path = row["folder_path"]
+    order = section_data.order
+    name = slugify(section_data.name)
+    if write_behind_enabled(user["id"]):
+        with get_db_context() as conn:
+            cursor = conn.cursor()
+            payload = {"folder_path": _touch_prompt(cursor, prompt_id, user["id"]), "version": version, "content": section_data.content}
+            if order:
+                payload["filename"] = f"{str(order).zfill(2)}_{name}.md"
+            else:
+                # Numbered by the drain when applied: a prompt's rows run one at a
+                # time, so the manifest it reads then holds every earlier write.
+                payload["name"] = name
+            return _queue_section_write(cursor, user["id"], prompt_id, "create_section", payload)
+
+    if not order:
+        # Next order from the manifest's filenames: one small read, no section bodies.
+        # The UPDATE in _touch_prompt below re-checks ownership against the row.
+        folder_path = require_prompt_folder(prompt_id, user["id"])
+        try:
+            manifest = await get_storage_service(user["id"]).get_manifest(folder_path, version) or {}
+        except Exception as e:
+            logger.error(f"Error reading manifest: {e}")
+            manifest = {}
+        order = next_section_order(manifest.get("sections", []))
+    filename = f"{str(order).zfill(2)}_{name}.md"
 
-    sections = await get_prompt_sections(prompt_id, version, user)
-    order = section_data.order if section_data.order else (max((s["order"] for s in sections), default=0) + 1)
-    filename = f"{str(order).zfill(2)}_{slugify(section_data.name)}.md"
+    with get_db_context() as conn:
+        folder_path = _touch_prompt(conn.cursor(), prompt_id, user["id"])
+    payload = {"folder_path": folder_path, "version": version, "filename": filename, "content": section_data.content}
 
     try:
         storage_service = get_storage_service(user["id"])
-        success = await storage_service.create_section(folder_path, filename, section_data.content, version)
-        if not success:
+        if not await apply_storage_write(storage_service, "create_section", payload):
             raise HTTPException(status_code=500, detail="Failed to create section")
-            
-        content_data = await storage_service.get_prompt_content(folder_path, version)
-        if content_data and "manifest" in content_data:
-            manifest = content_data["manifest"]
-            if filename not in manifest.get("sections", []):
-                manifest.setdefault("sections", []).append(filename)
-                await storage_service.update_manifest(folder_path, manifest, version)
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error creating section: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create section: {e}")
 
-    now = datetime.now(timezone.utc).isoformat()
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("UPDATE prompts SET updated_at = %s WHERE id = %s", (now, prompt_id))
-
     return {"filename": filename, "message": "Section created"}
 
 
@@ -544,30 +636,25 @@ async def update_section(
     user: dict = Depends(require_auth),
 ):
     from storage_service import get_storage_service
+    from storage_outbox import apply_storage_write, write_behind_enabled
 
+    write_behind = write_behind_enabled(user["id"])
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT folder_path FROM prompts WHERE id = %s AND user_id = %s", (prompt_id, user["id"]))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        folder_path = row["folder_path"]
+        folder_path = _touch_prompt(cursor, prompt_id, user["id"])
+        payload = {"folder_path": folder_path, "version": version, "filename": filename, "content": section_data.content}
+        if write_behind:
+            return _queue_section_write(cursor, user["id"], prompt_id, "update_section", payload)
 
     try:
         storage_service = get_storage_service(user["id"])
-        success = await storage_service.update_section(folder_path, filename, section_data.content, version)
-        if not success:
+        if not await apply_storage_write(storage_service, "update_section", payload):
             raise HTTPException(status_code=404, detail="Section not found")
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error updating section: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to update section: {e}")
-
-    now = datetime.now(timezone.utc).isoformat()
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("UPDATE prompts SET updated_at = %s WHERE id = %s", (now, prompt_id))
     return {"filename": filename, "message": "Section updated"}
 
 
@@ -576,27 +663,20 @@ async def delete_section(
     prompt_id: str, filename: str, version: str = "v1", user: dict = Depends(require_auth)
 ):
     from storage_service import get_storage_service
+    from storage_outbox import apply_storage_write, write_behind_enabled
 
+    write_behind = write_behind_enabled(user["id"])
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT folder_path FROM prompts WHERE id = %s AND user_id = %s", (prompt_id, user["id"]))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        folder_path = row["folder_path"]
+        folder_path = _touch_prompt(cursor, prompt_id, user["id"])
+        payload = {"folder_path": folder_path, "version": version, "filename": filename}
+        if write_behind:
+            return _queue_section_write(cursor, user["id"], prompt_id, "delete_section", payload)
 
     try:
         storage_service = get_storage_service(user["id"])
-        success = await storage_service.delete_section(folder_path, filename, version)
-        if not success:
+        if not await apply_storage_write(storage_service, "delete_section", payload):
             raise HTTPException(status_code=404, detail="Section not found")
-            
-        content_data = await storage_service.get_prompt_content(folder_path, version)
-        if content_data and "manifest" in content_data:
-            manifest = content_data["manifest"]
-            if filename in manifest.get("sections", []):
-                manifest["sections"].remove(filename)
-                await storage_service.update_manifest(folder_path, manifest, version)
     except HTTPException:
         raise
     except Exception as e:
@@ -613,34 +693,30 @@ async def reorder_sections(
     user: dict = Depends(require_auth),
 ):
     from storage_service import get_storage_service
-
+    from storage_outbox import apply_storage_write, write_behind_enabled
+
+    new_sections_list = []
+    renames = {}
+    for i, section in enumerate(reorder_data.sections):
+        old_filename = section["filename"]
+        name = section.get("name", old_filename.split("_", 1)[1].replace(".md", ""))
+        new_filename = f"{str(i + 1).zfill(2)}_{name}.md"
+        new_sections_list.append(new_filename)
+        if old_filename != new_filename:
+            renames[old_filename] = new_filename
+
+    write_behind = write_behind_enabled(user["id"])
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT folder_path FROM prompts WHERE id = %s AND user_id = %s", (prompt_id, user["id"]))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        folder_path = row["folder_path"]
+        folder_path = _touch_prompt(cursor, prompt_id, user["id"])
+        payload = {"folder_path": folder_path, "version": version, "renames": renames, "section_order": new_sections_list}
+        if write_behind:
+            return _queue_section_write(cursor, user["id"], prompt_id, "reorder_sections", payload)
 
     try:
         storage_service = get_storage_service(user["id"])
-        new_sections_list = []
-        for i, section in enumerate(reorder_data.sections):
-            old_filename = section["filename"]
-            name = section.get("name", old_filename.split("_", 1)[1].replace(".md", ""))
-            new_filename = f"{str(i + 1).zfill(2)}_{name}.md"
-            new_sections_list.append(new_filename)
-            if old_filename != new_filename:
-                section_data = await storage_service.get_section(folder_path, old_filename, version)
-                if section_data:
-                    await storage_service.create_section(folder_path, new_filename, section_data["content"], version)
-                    await storage_service.delete_section(folder_path, old_filename, version)
-                    
-        content_data = await storage_service.get_prompt_content(folder_path, version)
-        if content_data and "manifest" in content_data:
-            manifest = content_data["manifest"]
-            manifest["sections"] = new_sections_list
-            await storage_service.update_manifest(folder_path, manifest, version)
+        # One storage call: GitHub applies all renames + manifest as a single commit
+        await apply_storage_write(storage_service, "reorder_sections", payload)
     except HTTPException:
         raise
     except Exception as e:
@@ -654,7 +730,7 @@ async def reorder_sections(
 # ─────────────────────────────────────────────
 
 @router.get("/prompts/{prompt_id}/versions")
-async def get_prompt_versions(prompt_id: str):
+def get_prompt_versions(prompt_id: str):
     with get_db_context() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM prompt_versions WHERE prompt_id = %s ORDER BY created_at DESC", (prompt_id,))
@@ -712,13 +788,13 @@ async def create_version(
     if use_github:
         from routes.render import github_api_request
 
-        ref_data = await github_api_request("GET", f"/git/refs/heads/{source_branch}")
+        ref_data = await github_api_request("GET", f"/git/refs/heads/{source_branch}", user_id=user["id"])
         if not ref_data:
             raise HTTPException(status_code=400, detail=f"Source branch '{source_branch}' not found")
         await github_api_request("POST", "/git/refs", {
             "ref": f"refs/heads/{branch_name}",
             "sha": ref_data["object"]["sha"],
-        })
+        }, user_id=user["id"])
     else:
         # Local/database storage: copy the source version's content into the new version.
         storage = get_storage_service(user["id"])
@@ -739,7 +815,7 @@ async def create_version(
                 logger.warning(f"Could not write manifest for new version {branch_name}: {e}")
 
     version_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     with get_db_context() as conn:
         cursor = conn.cursor()
         cursor.execute(
@@ -6,18 +6,20 @@ Handles: POST /prompts/{prompt_id}/{version}/render
 
 Also exposes github_api_request() used by routes/prompts.py create_version.
 """
+import asyncio
 import base64
 import logging
 import os
 from typing import Any, Dict, List, Optional
 
-import httpx
 from fastapi import APIRouter, Depends, Header, HTTPException
 from pydantic import BaseModel
 
 from core.auth import verify_api_key, get_current_user
-from core.db import get_db_context, get_github_settings
-from routes.prompts import extract_variables, inject_variables
+from core.db import get_github_settings
+from core.github import github_request
+from routes.prompt_access import get_prompt_location
+from services.prompt_renderer import resolve_variables, substitute_variables
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -50,26 +52,17 @@ async def github_api_request(method: str, endpoint: str, data: dict = None, user
         "Authorization": f"token {settings['github_token']}",
         "Accept": "application/vnd.github.v3+json",
     }
-    base_url = f"https://api.github.com/repos/{settings['github_owner']}/{settings['github_repo']}"
-    url = f"{base_url}{endpoint}"
-    async with httpx.AsyncClient() as client:
-        if method == "GET":
-            response = await client.get(url, headers=headers)
-        elif method == "PUT":
-            response = await client.put(url, headers=headers, json=data)
-        elif method == "POST":
-            response = await client.post(url, headers=headers, json=data)
-        elif method == "DELETE":
-            response = await client.delete(url, headers=headers)
-        else:
-            raise ValueError(f"Unsupported method: {method}")
-        if response.status_code == 404:
-            return None
-        if response.status_code >= 400:
-            raise HTTPException(status_code=response.status_code, detail=response.text)
-        if response.status_code == 204:
-            return {}
-        return response.json()
+    if method not in ("GET", "PUT", "POST", "DELETE"):
+        raise ValueError(f"Unsupported method: {method}")
+    url = f"/repos/{settings['github_owner']}/{settings['github_repo']}{endpoint}"
+    response = await github_request(method, url, headers, json=data)
+    if response.status_code == 404:
+        return None
+    if response.status_code >= 400:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    if response.status_code == 204:
+        return {}
+    return response.json()
 
 
 # ─────────────────────────────────────────────
@@ -84,21 +77,20 @@ async def render_prompt(
     api_key: dict = Depends(verify_api_key),
     authorization: str = Header(None),
 ):
-    if not api_key and not authorization:
-        raise HTTPException(status_code=401, detail="Prompt credentials required")
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM prompts WHERE id = %s", (prompt_id,))
-        prompt = cursor.fetchone()
-        if not prompt:
-            raise HTTPException(status_code=404, detail="Prompt not found")
-        folder_path = prompt["folder_path"]
-        user_id = prompt["user_id"]
+    if not api_key and not authorization:
+        raise HTTPException(status_code=401, detail="Prompt credentials required")
+    # Blocking DB work (prompt lookup, JWT user read, variable resolution) runs
+    # on worker threads so concurrent renders overlap with GitHub fetches.
+    prompt = await asyncio.to_thread(get_prompt_location, prompt_id)
+    if not prompt:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    folder_path = prompt["folder_path"]
+    user_id = prompt["user_id"]
 
     # Browser preview uses the owner's JWT; external consumers use a prompt API
     # key. Legacy keys created before ownership was introduced have user_id NULL
     # and retain their historical global behavior during the migration window.
-    jwt_user = get_current_user(authorization) if authorization else None
+    jwt_user = await asyncio.to_thread(get_current_user, authorization) if authorization else None
     legacy_global_keys = os.environ.get("LEGACY_PROMPT_KEYS_GLOBAL", "true").lower() in {"1", "true", "yes"}
     key_allowed = bool(
         api_key and (
@@ -119,26 +111,31 @@ async def render_prompt(
     if not prompt_content or not prompt_content.get("sections"):
         raise HTTPException(status_code=404, detail="No sections found")
 
-    compiled_parts = []
-    sections_used = []
-    all_variables = set()
-
-    for section in prompt_content["sections"]:
-        content = section.get("content", "")
-        filename = section.get("filename", "unknown")
-        all_variables.update(extract_variables(content))
-        content = inject_variables(
-            content,
+    # Resolve stored/entity variables once for the whole prompt, then substitute
+    # each section in a single scan that also collects unresolved placeholders.
+    sections = prompt_content["sections"]
+    flat_resolved = {}
+    if any("{{" in section.get("content", "") for section in sections):
+        flat_resolved = await asyncio.to_thread(
+            resolve_variables,
             render_data.variables or {},
             prompt_id=prompt_id,
             user_id=user_id,
             version=version,
         )
+
+    compiled_parts = []
+    sections_used = []
+    missing = {}
+
+    for section in sections:
+        content, section_missing = substitute_variables(section.get("content", ""), flat_resolved)
+        missing.update(dict.fromkeys(section_missing))
         compiled_parts.append(content)
-        sections_used.append(filename)
+        sections_used.append(section.get("filename", "unknown"))
 
     compiled_prompt = "\n\n---\n\n".join(compiled_parts)
-    remaining = extract_variables(compiled_prompt)
+    remaining = list(missing)
     if remaining:
         raise HTTPException(
             status_code=400,
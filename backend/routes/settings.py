@@ -3,21 +3,32 @@ routes/settings.py — Settings endpoints
 
 Handles: GitHub settings CRUD, storage mode switching, GitHub user lookup.
 """
+import asyncio
+import hashlib
 import logging
-from datetime import datetime, timezone
 from typing import Optional
 
-import httpx
 from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel
 
-from core.auth import require_auth
-from core.db import get_db_context, get_github_settings
+from core.auth import require_auth_id
+from core.cache import TTLCache
+from core.db import get_db_context, get_github_settings, invalidate_github_settings
+from core.github import github_request
 from core.secrets import encrypt_secret
+from core.utils import utcnow
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Successful GitHub lookups keyed by a token fingerprint, so a rotated token
+# misses naturally. Failures are never cached.
+_github_lookup_cache = TTLCache(maxsize=1024, ttl=300)
+
+
+def _token_fingerprint(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
 
 # ─────────────────────────────────────────────
 # Pydantic Models
@@ -43,13 +54,34 @@ class StorageModeUpdate(BaseModel):
     storage_mode: str  # 'github' or 'local'
 
 
+# Blocking DB helper; save_settings awaits GitHub, so it runs this via
+# asyncio.to_thread. The other endpoints are plain def and use the threadpool.
+
+def _store_github_settings(user_id: str, settings_data: SettingsCreate, now: str) -> int:
+    with get_db_context() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM settings WHERE user_id = %s", (user_id,))
+        existing = cursor.fetchone()
+        if existing:
+            cursor.execute(
+                "UPDATE settings SET github_token=%s, github_repo=%s, github_owner=%s, storage_mode='github', updated_at=%s WHERE user_id=%s",
+                (encrypt_secret(settings_data.github_token), settings_data.github_repo, settings_data.github_owner, now, user_id),
+            )
+            return existing["id"]
+        cursor.execute(
+            "INSERT INTO settings (user_id, github_token, github_repo, github_owner, storage_mode, created_at, updated_at) VALUES (%s,%s,%s,%s,%s,%s,%s) RETURNING id",
+            (user_id, encrypt_secret(settings_data.github_token), settings_data.github_repo, settings_data.github_owner, 'github', now, now),
+        )
+        return cursor.fetchone()["id"]
+
+
 # ─────────────────────────────────────────────
 # Endpoints
 # ─────────────────────────────────────────────
 
 @router.get("/settings", response_model=SettingsResponse)
-async def get_settings(user: dict = Depends(require_auth)):
-    settings = get_github_settings(user["id"])
+def get_settings(user_id: str = Depends(require_auth_id)):
+    settings = get_github_settings(user_id)
     if settings:
         storage_mode = settings.get("storage_mode", "local")
         has_github = bool(settings.get("github_token")) and bool(settings.get("github_repo"))
@@ -66,53 +98,49 @@ async def get_settings(user: dict = Depends(require_auth)):
 
 
 @router.post("/settings", response_model=SettingsResponse)
-async def save_settings(settings_data: SettingsCreate, user: dict = Depends(require_auth)):
-    now = datetime.now(timezone.utc).isoformat()
+async def save_settings(settings_data: SettingsCreate, user_id: str = Depends(require_auth_id)):
+    now = utcnow()
     headers = {
         "Authorization": f"Bearer {settings_data.github_token}",
         "Accept": "application/vnd.github.v3+json",
     }
-    async with httpx.AsyncClient() as client:
-        if settings_data.create_repo:
-            create_resp = await client.post(
-                "https://api.github.com/user/repos",
-                headers=headers,
-                json={
-                    "name": settings_data.github_repo,
-                    "description": "Prompt Manager - AI prompt versioning repository",
-                    "private": False,
-                    "auto_init": True,
-                },
-            )
-            if create_resp.status_code == 201:
-                settings_data.github_owner = create_resp.json()["owner"]["login"]
-            elif create_resp.status_code != 422:
-                raise HTTPException(status_code=400, detail=f"Failed to create repository: {create_resp.text}")
-
-        resp = await client.get(
-            f"https://api.github.com/repos/{settings_data.github_owner}/{settings_data.github_repo}",
-            headers=headers,
+    if settings_data.create_repo:
+        create_resp = await github_request(
+            "POST",
+            "/user/repos",
+            headers,
+            json={
+                "name": settings_data.github_repo,
+                "description": "Prompt Manager - AI prompt versioning repository",
+                "private": False,
+                "auto_init": True,
+            },
+        )
+        if create_resp.status_code == 201:
+            settings_data.github_owner = create_resp.json()["owner"]["login"]
+        elif create_resp.status_code != 422:
+            raise HTTPException(status_code=400, detail=f"Failed to create repository: {create_resp.text}")
+
+    repo_key = ("repo", _token_fingerprint(settings_data.github_token), settings_data.github_owner, settings_data.github_repo)
+    if settings_data.create_repo:
+        # A 201 already proves token + repo; anything else re-checks from scratch.
+        if create_resp.status_code == 201:
+            _github_lookup_cache.set(repo_key, True)
+        else:
+            _github_lookup_cache.pop(repo_key)
+    if not _github_lookup_cache.get(repo_key):
+        resp = await github_request(
+            "GET",
+            f"/repos/{settings_data.github_owner}/{settings_data.github_repo}",
+            headers,
         )
         if resp.status_code != 200:
             logger.error(f"GitHub repository check failed for {settings_data.github_owner}/{settings_data.github_repo}. Status: {resp.status_code}, Body: {resp.text}")
             raise HTTPException(status_code=400, detail=f"Invalid GitHub credentials or repository not found: {resp.text}")
+        _github_lookup_cache.set(repo_key, True)
 
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM settings WHERE user_id = %s", (user["id"],))
-        existing = cursor.fetchone()
-        if existing:
-            cursor.execute(
-                "UPDATE settings SET github_token=%s, github_repo=%s, github_owner=%s, storage_mode='github', updated_at=%s WHERE user_id=%s",
-                (encrypt_secret(settings_data.github_token), settings_data.github_repo, settings_data.github_owner, now, user["id"]),
-            )
-            settings_id = existing["id"]
-        else:
-            cursor.execute(
-                "INSERT INTO settings (user_id, github_token, github_repo, github_owner, storage_mode, created_at, updated_at) VALUES (%s,%s,%s,%s,%s,%s,%s) RETURNING id",
-                (user["id"], encrypt_secret(settings_data.github_token), settings_data.github_repo, settings_data.github_owner, 'github', now, now),
-            )
-            settings_id = cursor.fetchone()["id"]
+    settings_id = await asyncio.to_thread(_store_github_settings, user_id, settings_data, now)
+    invalidate_github_settings(user_id)
 
     return SettingsResponse(
         id=settings_id,
@@ -125,27 +153,28 @@ async def save_settings(settings_data: SettingsCreate, user: dict = Depends(requ
 
 
 @router.delete("/settings")
-async def delete_settings(user: dict = Depends(require_auth)):
+def delete_settings(user_id: str = Depends(require_auth_id)):
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM settings WHERE user_id = %s", (user["id"],))
+        cursor.execute("DELETE FROM settings WHERE user_id = %s", (user_id,))
+    invalidate_github_settings(user_id)
     return {"message": "Settings deleted"}
 
 
 @router.post("/settings/storage-mode", response_model=SettingsResponse)
-async def set_storage_mode(mode_data: StorageModeUpdate, user: dict = Depends(require_auth)):
+def set_storage_mode(mode_data: StorageModeUpdate, user_id: str = Depends(require_auth_id)):
     """Set the storage mode for the user (github or local)."""
     if mode_data.storage_mode not in ["github", "local"]:
         raise HTTPException(status_code=400, detail="Invalid storage mode. Must be 'github' or 'local'")
-    now = datetime.now(timezone.utc).isoformat()
+    now = utcnow()
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM settings WHERE user_id = %s", (user["id"],))
+        cursor.execute("SELECT id, github_token, github_repo, github_owner FROM settings WHERE user_id = %s", (user_id,))
         existing = cursor.fetchone()
         if existing:
             cursor.execute(
                 "UPDATE settings SET storage_mode=%s, updated_at=%s WHERE user_id=%s",
-                (mode_data.storage_mode, now, user["id"]),
+                (mode_data.storage_mode, now, user_id),
             )
             settings_id = existing["id"]
             is_configured = True if mode_data.storage_mode == "local" else bool(existing["github_token"])
@@ -155,13 +184,14 @@ async def set_storage_mode(mode_data: StorageModeUpdate, user: dict = Depends(re
         else:
             cursor.execute(
                 "INSERT INTO settings (user_id, storage_mode, created_at, updated_at) VALUES (%s,%s,%s,%s) RETURNING id",
-                (user["id"], mode_data.storage_mode, now, now),
+                (user_id, mode_data.storage_mode, now, now),
             )
             settings_id = cursor.fetchone()["id"]
             is_configured = mode_data.storage_mode == "local"
             has_github = False
             github_repo = None
             github_owner = None
+    invalidate_github_settings(user_id)
 
     return SettingsResponse(
         id=settings_id,
@@ -177,7 +207,7 @@ async def set_storage_mode(mode_data: StorageModeUpdate, user: dict = Depends(re
 async def get_github_user(
     token: Optional[str] = Query(None),
     x_github_token: Optional[str] = Header(None, alias="X-GitHub-Token"),
-    user: dict = Depends(require_auth),
+    user_id: str = Depends(require_auth_id),
 ):
     """Get GitHub user info from token."""
     token = x_github_token or token
@@ -185,9 +215,14 @@ async def get_github_user(
         raise HTTPException(status_code=422, detail="GitHub token required")
     if not x_github_token:
         logger.warning("Deprecated GitHub token query parameter used; send X-GitHub-Token instead")
+    user_key = ("user", _token_fingerprint(token))
+    cached = _github_lookup_cache.get(user_key)
+    if cached is not None:
+        return cached
     headers = {"Authorization": f"Bearer {token}", "Accept": "application/vnd.github.v3+json"}
-    async with httpx.AsyncClient() as client:
-        resp = await client.get("https://api.github.com/user", headers=headers)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=400, detail="Invalid GitHub token")
-        return resp.json()
+    resp = await github_request("GET", "/user", headers)
+    if resp.status_code != 200:
+        raise HTTPException(status_code=400, detail="Invalid GitHub token")
+    github_user = resp.json()
+    _github_lookup_cache.set(user_key, github_user)
+    return github_user
@@ -1,38 +1,56 @@
 """
 routes/templates.py — Template endpoints (no auth required)
 """
-import json
+import hashlib
 import logging
 
-from fastapi import APIRouter, HTTPException
+import orjson
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
+from core.cache import TTLCache
 from core.db import get_db_context
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Templates are only written by the first-boot seed, so the parsed rows, their
+# serialised body and its ETag are kept per worker; the TTL picks up manual
+# edits to the table without a restart.
+_templates_cache = TTLCache(maxsize=1, ttl=300)
 
-@router.get("/templates")
-async def get_templates():
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM templates ORDER BY created_at")
-        rows = cursor.fetchall()
+
+def _load_templates() -> tuple:
+    """Return (templates by id, JSON body of the list, ETag), cached."""
+    cached = _templates_cache.get("templates")
+    if cached is None:
+        with get_db_context() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM templates ORDER BY created_at")
+            rows = cursor.fetchall()
         templates = []
         for row in rows:
             t = dict(row)
-            t["sections"] = json.loads(t["sections"])
+            t["sections"] = orjson.loads(t["sections"])
             templates.append(t)
-        return templates
+        body = orjson.dumps(templates)
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        cached = ({t["id"]: t for t in templates}, body, etag)
+        _templates_cache.set("templates", cached)
+    return cached
+
+
+@router.get("/templates")
+def get_templates(request: Request):
+    _, body, etag = _load_templates()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 
 @router.get("/templates/{template_id}")
-async def get_template(template_id: str):
-    with get_db_context() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM templates WHERE id = %s", (template_id,))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Template not found")
-        t = dict(row)
-        t["sections"] = json.loads(t["sections"])
-        return t
+def get_template(template_id: str):
+    by_id, _, _ = _load_templates()
+    t = by_id.get(template_id)
+    if not t:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return ORJSONResponse(t)
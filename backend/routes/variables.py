@@ -8,14 +8,15 @@ Handles:
 """
 import logging
 import uuid
-from datetime import datetime, timezone
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
-from core.auth import require_auth
+from core.auth import require_auth_id
 from core.db import get_db_context
+from core.utils import utcnow
 from routes.prompt_access import require_prompt_owner
 
 logger = logging.getLogger(__name__)
@@ -65,74 +66,117 @@ class AvailableVariableResponse(BaseModel):
     required: bool = False
 
 
+# Fixed statements, kept as constants so every call sends byte-identical SQL
+# (the form pg_stat_statements and any driver-side statement cache key on).
+# Mutations are single statements: the UNIQUE constraints arbitrate duplicate
+# creates, and RETURNING / rowcount stand in for a separate existence check.
+_LIST_ACCOUNT_VARIABLES = (
+    "SELECT id, user_id, name, value, description, created_at, updated_at "
+    "FROM account_variables WHERE user_id = %s ORDER BY name"
+)
+_INSERT_ACCOUNT_VARIABLE = (
+    "INSERT INTO account_variables (id, user_id, name, value, description, created_at, updated_at) "
+    "VALUES (%s,%s,%s,%s,%s,%s,%s) ON CONFLICT (user_id, name) DO NOTHING RETURNING id"
+)
+_UPDATE_ACCOUNT_VARIABLE = (
+    "UPDATE account_variables SET value = COALESCE(%s, value), description = COALESCE(%s, description), "
+    "updated_at = %s WHERE user_id = %s AND name = %s RETURNING id, value, description, created_at"
+)
+_DELETE_ACCOUNT_VARIABLE = "DELETE FROM account_variables WHERE user_id = %s AND name = %s"
+# Prompt-scoped statements carry the ownership check themselves, so the
+# common case is one statement; require_prompt_owner runs only when nothing
+# matched, to tell "not your prompt" (404) from "no such variable".
+_OWNS_PROMPT = "EXISTS (SELECT 1 FROM prompts WHERE id = %(prompt_id)s AND user_id = %(user_id)s)"
+_LIST_PROMPT_VARIABLES = (
+    "SELECT id, prompt_id, version, name, value, description, COALESCE(required, FALSE) AS required, "
+    "created_at, updated_at FROM prompt_variables WHERE prompt_id = %(prompt_id)s AND version = %(version)s "
+    f"AND {_OWNS_PROMPT} ORDER BY name"
+)
+_INSERT_PROMPT_VARIABLE = (
+    "INSERT INTO prompt_variables (id, prompt_id, version, name, value, description, required, created_at, updated_at) "
+    "SELECT %(id)s, %(prompt_id)s, %(version)s, %(name)s, %(value)s, %(description)s, FALSE, %(now)s, %(now)s "
+    f"WHERE {_OWNS_PROMPT} ON CONFLICT (prompt_id, version, name) DO NOTHING RETURNING id"
+)
+_UPDATE_PROMPT_VARIABLE = (
+    "UPDATE prompt_variables SET value = COALESCE(%(value)s, value), description = COALESCE(%(description)s, description), "
+    "updated_at = %(now)s WHERE prompt_id = %(prompt_id)s AND version = %(version)s AND name = %(name)s "
+    f"AND {_OWNS_PROMPT} RETURNING id, value, description, required, created_at"
+)
+_DELETE_PROMPT_VARIABLE = (
+    "DELETE FROM prompt_variables WHERE prompt_id = %(prompt_id)s AND version = %(version)s AND name = %(name)s "
+    f"AND {_OWNS_PROMPT}"
+)
+# Prompt-level rows first; account-level rows only where no prompt-level
+# variable of the same name shadows them (probed via the UNIQUE index).
+_AVAILABLE_VARIABLES = f"""
+    SELECT name, value, description, 'prompt' AS source, COALESCE(required, FALSE) AS required
+    FROM prompt_variables
+    WHERE prompt_id = %(prompt_id)s AND version = %(version)s AND {_OWNS_PROMPT}
+    UNION ALL
+    SELECT a.name, a.value, a.description, 'account' AS source, FALSE AS required
+    FROM account_variables a
+    WHERE a.user_id = %(user_id)s AND {_OWNS_PROMPT}
+      AND NOT EXISTS (
+          SELECT 1 FROM prompt_variables p
+          WHERE p.prompt_id = %(prompt_id)s AND p.version = %(version)s AND p.name = a.name
+      )
+    ORDER BY source DESC, name
+"""
+
+
 # ─────────────────────────────────────────────
 # Account Variables
 # ─────────────────────────────────────────────
 
 @router.get("/account-variables", response_model=List[AccountVariableResponse])
-async def list_account_variables(user: dict = Depends(require_auth)):
+def list_account_variables(user_id: str = Depends(require_auth_id)):
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM account_variables WHERE user_id = %s ORDER BY name", (user["id"],))
-        return [
-            AccountVariableResponse(
-                id=row["id"], user_id=row["user_id"], name=row["name"],
-                value=row["value"], description=row["description"],
-                created_at=row["created_at"], updated_at=row["updated_at"],
-            )
-            for row in cursor.fetchall()
-        ]
+        cursor.execute(_LIST_ACCOUNT_VARIABLES, (user_id,))
+        rows = cursor.fetchall()
+    # Rows already have the response shape (response_model documents it), so
+    # they are serialised directly rather than validated into models first.
+    return ORJSONResponse(rows)
 
 
 @router.post("/account-variables", response_model=AccountVariableResponse)
-async def create_account_variable(data: VariableCreate, user: dict = Depends(require_auth)):
-    now = datetime.now(timezone.utc).isoformat()
+def create_account_variable(data: VariableCreate, user_id: str = Depends(require_auth_id)):
+    now = utcnow()
     var_id = str(uuid.uuid4())
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT id FROM account_variables WHERE user_id = %s AND name = %s", (user["id"], data.name))
-        if cursor.fetchone():
+        cursor.execute(_INSERT_ACCOUNT_VARIABLE, (var_id, user_id, data.name, data.value, data.description, now, now))
+        if not cursor.fetchone():
             raise HTTPException(status_code=400, detail=f"Variable '{data.name}' already exists")
-        cursor.execute(
-            "INSERT INTO account_variables (id, user_id, name, value, description, created_at, updated_at) VALUES (%s,%s,%s,%s,%s,%s,%s)",
-            (var_id, user["id"], data.name, data.value, data.description, now, now),
-        )
     return AccountVariableResponse(
-        id=var_id, user_id=user["id"], name=data.name, value=data.value,
+        id=var_id, user_id=user_id, name=data.name, value=data.value,
         description=data.description, created_at=now, updated_at=now,
     )
 
 
 @router.put("/account-variables/{name}", response_model=AccountVariableResponse)
-async def update_account_variable(name: str, data: VariableUpdate, user: dict = Depends(require_auth)):
-    now = datetime.now(timezone.utc).isoformat()
+def update_account_variable(name: str, data: VariableUpdate, user_id: str = Depends(require_auth_id)):
+    now = utcnow()
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM account_variables WHERE user_id = %s AND name = %s", (user["id"], name))
-        existing = cursor.fetchone()
-        if not existing:
+        cursor.execute(_UPDATE_ACCOUNT_VARIABLE, (data.value, data.description, now, user_id, name))
+        updated = cursor.fetchone()
+        if not updated:
             raise HTTPException(status_code=404, detail=f"Variable '{name}' not found")
-        new_value = data.value if data.value is not None else existing["value"]
-        new_desc = data.description if data.description is not None else existing["description"]
-        cursor.execute(
-            "UPDATE account_variables SET value=%s, description=%s, updated_at=%s WHERE user_id=%s AND name=%s",
-            (new_value, new_desc, now, user["id"], name),
-        )
     return AccountVariableResponse(
-        id=existing["id"], user_id=user["id"], name=name,
-        value=new_value, description=new_desc,
-        created_at=existing["created_at"], updated_at=now,
+        id=updated["id"], user_id=user_id, name=name,
+        value=updated["value"], description=updated["description"],
+        created_at=updated["created_at"], updated_at=now,
     )
 
 
 @router.delete("/account-variables/{name}")
-async def delete_account_variable(name: str, user: dict = Depends(require_auth)):
+def delete_account_variable(name: str, user_id: str = Depends(require_auth_id)):
     with get_db_context() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT id FROM account_variables WHERE user_id = %s AND name = %s", (user["id"], name))
-        if not cursor.fetchone():
+        cursor.execute(_DELETE_ACCOUNT_VARIABLE, (user_id, name))
+        if cursor.rowcount == 0:
             raise HTTPException(status_code=404, detail=f"Variable '{name}' not found")
-        cursor.execute("DELETE FROM account_variables WHERE user_id = %s AND name = %s", (user["id"], name))
     return {"message": f"Variable '{name}' deleted"}
 
 
@@ -141,41 +185,29 @@ async def delete_account_variable(name: str, user: dict = Depends(require_auth))
 # ─────────────────────────────────────────────
 
 @router.get("/prompts/{prompt_id}/variables", response_model=List[PromptVariableResponse])
-async def list_prompt_variables(prompt_id: str, version: str = "v1", user: dict = Depends(require_auth)):
+def list_prompt_variables(prompt_id: str, version: str = "v1", user_id: str = Depends(require_auth_id)):
     with get_db_context() as conn:
         cursor = conn.cursor()
-        require_prompt_owner(cursor, prompt_id, user["id"])
-        cursor.execute(
-            "SELECT * FROM prompt_variables WHERE prompt_id = %s AND version = %s ORDER BY name",
-            (prompt_id, version),
-        )
-        return [
-            PromptVariableResponse(
-                id=row["id"], prompt_id=row["prompt_id"], version=row["version"],
-                name=row["name"], value=row["value"], description=row["description"],
-                required=bool(row["required"]), created_at=row["created_at"], updated_at=row["updated_at"],
-            )
-            for row in cursor.fetchall()
-        ]
+        cursor.execute(_LIST_PROMPT_VARIABLES, {"prompt_id": prompt_id, "version": version, "user_id": user_id})
+        rows = cursor.fetchall()
+        if not rows:
+            require_prompt_owner(cursor, prompt_id, user_id)
+    return ORJSONResponse(rows)
 
 
 @router.post("/prompts/{prompt_id}/variables", response_model=PromptVariableResponse)
-async def create_prompt_variable(prompt_id: str, data: VariableCreate, version: str = "v1", user: dict = Depends(require_auth)):
-    now = datetime.now(timezone.utc).isoformat()
+def create_prompt_variable(prompt_id: str, data: VariableCreate, version: str = "v1", user_id: str = Depends(require_auth_id)):
+    now = utcnow()
     var_id = str(uuid.uuid4())
     with get_db_context() as conn:
         cursor = conn.cursor()
-        require_prompt_owner(cursor, prompt_id, user["id"])
-        cursor.execute(
-            "SELECT id FROM prompt_variables WHERE prompt_id = %s AND version = %s AND name = %s",
-            (prompt_id, version, data.name),
-        )
-        if cursor.fetchone():
+        cursor.execute(_INSERT_PROMPT_VARIABLE, {
+            "id": var_id, "prompt_id": prompt_id, "version": version, "name": data.name,
+            "value": data.value, "description": data.description, "now": now, "user_id": user_id,
+        })
+        if not cursor.fetchone():
+            require_prompt_owner(cursor, prompt_id, user_id)
             raise HTTPException(status_code=400, detail=f"Variable '{data.name}' already exists for this version")
-        cursor.execute(
-            "INSERT INTO prompt_variables (id, prompt_id, version, name, value, description, required, created_at, updated_at) VALUES (%s,%s,%s,%s,%s,%s,FALSE,%s,%s)",
-            (var_id, prompt_id, version, data.name, data.value, data.description, now, now),
-        )
     return PromptVariableResponse(
         id=var_id, prompt_id=prompt_id, version=version, name=data.name,
         value=data.value, description=data.description, required=False,
@@ -184,46 +216,33 @@ async def create_prompt_variable(prompt_id: str, data: VariableCreate, version:
 
 
 @router.put("/prompts/{prompt_id}/variables/{name}", response_model=PromptVariableResponse)
-async def update_prompt_variable(prompt_id: str, name: str, data: VariableUpdate, version: str = "v1", user: dict = Depends(require_auth)):
-    now = datetime.now(timezone.utc).isoformat()
+def update_prompt_variable(prompt_id: str, name: str, data: VariableUpdate, version: str = "v1", user_id: str = Depends(require_auth_id)):
+    now = utcnow()
     with get_db_context() as conn:
         cursor = conn.cursor()
-        require_prompt_owner(cursor, prompt_id, user["id"])
-        cursor.execute(
-            "SELECT * FROM prompt_variables WHERE prompt_id = %s AND version = %s AND name = %s",
-            (prompt_id, version, name),
-        )
-        existing = cursor.fetchone()
-        if not existing:
+        cursor.execute(_UPDATE_PROMPT_VARIABLE, {
+            "value": data.value, "description": data.description, "now": now,
+            "prompt_id": prompt_id, "version": version, "name": name, "user_id": user_id,
+        })
+        updated = cursor.fetchone()
+        if not updated:
+            require_prompt_owner(cursor, prompt_id, user_id)
             raise HTTPException(status_code=404, detail=f"Variable '{name}' not found")
-        new_value = data.value if data.value is not None else existing["value"]
-        new_desc = data.description if data.description is not None else existing["description"]
-        cursor.execute(
-            "UPDATE prompt_variables SET value=%s, description=%s, updated_at=%s WHERE prompt_id=%s AND version=%s AND name=%s",
-            (new_value, new_desc, now, prompt_id, version, name),
-        )
     return PromptVariableResponse(
-        id=existing["id"], prompt_id=prompt_id, version=version, name=name,
-        value=new_value, description=new_desc, required=bool(existing["required"]),
-        created_at=existing["created_at"], updated_at=now,
+        id=updated["id"], prompt_id=prompt_id, version=version, name=name,
+        value=updated["value"], description=updated["description"], required=bool(updated["required"]),
+        created_at=updated["created_at"], updated_at=now,
     )
 
 
 @router.delete("/prompts/{prompt_id}/variables/{name}")
-async def delete_prompt_variable(prompt_id: str, name: str, version: str = "v1", user: dict = Depends(require_auth)):
+def delete_prompt_variable(prompt_id: str, name: str, version: str = "v1", user_id: str = Depends(require_auth_id)):
     with get_db_context() as conn:
         cursor = conn.cursor()
-        require_prompt_owner(cursor, prompt_id, user["id"])
-        cursor.execute(
-            "SELECT id FROM prompt_variables WHERE prompt_id = %s AND version = %s AND name = %s",
-            (prompt_id, version, name),
-        )
-        if not cursor.fetchone():
+        cursor.execute(_DELETE_PROMPT_VARIABLE, {"prompt_id": prompt_id, "version": version, "name": name, "user_id": user_id})
+        if cursor.rowcount == 0:
+            require_prompt_owner(cursor, prompt_id, user_id)
             raise HTTPException(status_code=404, detail=f"Variable '{name}' not found")
-        cursor.execute(
-            "DELETE FROM prompt_variables WHERE prompt_id = %s AND version = %s AND name = %s",
-            (prompt_id, version, name),
-        )
     return {"message": f"Variable '{name}' deleted"}
 
 
@@ -232,30 +251,16 @@ async def delete_prompt_variable(prompt_id: str, name: str, version: str = "v1",
 # ─────────────────────────────────────────────
 
 @router.get("/prompts/{prompt_id}/available-variables", response_model=List[AvailableVariableResponse])
-async def get_available_variables(prompt_id: str, version: str = "v1", user: dict = Depends(require_auth)):
+def get_available_variables(prompt_id: str, version: str = "v1", user_id: str = Depends(require_auth_id)):
     """Get all available variables for a prompt (prompt-level + account-level + entity schema)."""
-    variables = []
-    seen = set()
     with get_db_context() as conn:
         cursor = conn.cursor()
-        require_prompt_owner(cursor, prompt_id, user["id"])
-        # Prompt-level (higher priority)
-        cursor.execute("SELECT * FROM prompt_variables WHERE prompt_id = %s AND version = %s", (prompt_id, version))
-        for row in cursor.fetchall():
-            seen.add(row["name"])
-            variables.append(AvailableVariableResponse(
-                name=row["name"], value=row["value"], description=row["description"],
-                source="prompt", required=bool(row["required"]),
-            ))
-        # Account-level (lower priority)
-        cursor.execute("SELECT * FROM account_variables WHERE user_id = %s", (user["id"],))
-        for row in cursor.fetchall():
-            if row["name"] not in seen:
-                seen.add(row["name"])
-                variables.append(AvailableVariableResponse(
-                    name=row["name"], value=row["value"], description=row["description"],
-                    source="account", required=False,
-                ))
+        # Prompt-level shadows account-level; the query resolves that itself
+        cursor.execute(_AVAILABLE_VARIABLES, {"prompt_id": prompt_id, "version": version, "user_id": user_id})
+        variables = cursor.fetchall()
+        if not variables:
+            require_prompt_owner(cursor, prompt_id, user_id)
+    seen = {variable["name"] for variable in variables}
 
     # Entity schema variables from the memory system (system-sourced, read-only)
     try:
@@ -292,7 +297,7 @@ async def get_available_variables(prompt_id: str, version: str = "v1", user: dic
                 ]:
                     if var_name not in seen:
                         seen.add(var_name)
-                        variables.append(AvailableVariableResponse(
+                        variables.append(dict(
                             name=var_name, value=None, description=desc,
                             source="system", required=False,
                         ))
@@ -302,7 +307,7 @@ async def get_available_variables(prompt_id: str, version: str = "v1", user: dic
                     var_name = f"{base_prefix}.summary"
                     if var_name not in seen:
                         seen.add(var_name)
-                        variables.append(AvailableVariableResponse(
+                        variables.append(dict(
                             name=var_name, value=None,
                             description=f"Summary field ({field_map['summary_field']}) from {icon} {entity_type}",
                             source="system", required=False,
@@ -313,7 +318,7 @@ async def get_available_variables(prompt_id: str, version: str = "v1", user: dic
                     var_name = f"{base_prefix}.{field}"
                     if var_name not in seen:
                         seen.add(var_name)
-                        variables.append(AvailableVariableResponse(
+                        variables.append(dict(
                             name=var_name, value=None,
                             description=f"CRM field '{field}' from {icon} {entity_type} profile",
                             source="system", required=False,
@@ -322,4 +327,4 @@ async def get_available_variables(prompt_id: str, version: str = "v1", user: dic
     except Exception as e:
         logger.warning(f"Failed to load entity schema variables: {e}")
 
-    return variables
+    return ORJSONResponse(variables)
@@ -3,8 +3,7 @@ import logging
 import os
 from typing import List
 
-import httpx
-
+from core.http import get_http_client
 from services.config_helpers import get_llm_config
 from services.job_safety import ProviderStopError, provider_stop_from_response, record_provider_stop
 
@@ -58,22 +57,23 @@ async def generate_embedding(text: str) -> List[float]:
     if not bounded.strip():
         raise ValueError("Invalid embedding input: input cannot be empty")
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{api_base}/embeddings",
-                headers=headers,
-                json={"model": model, "input": bounded},
-            )
-            if response.status_code == 200:
-                return response.json()["data"][0]["embedding"]
-            provider_stop = provider_stop_from_response(
-                response.status_code, response.text, response.headers.get("retry-after")
-            )
-            if provider_stop:
-                record_provider_stop(provider_stop, source="embedding")
-                raise provider_stop
-            logger.error(f"Embedding call failed: {response.status_code}")
-            raise RuntimeError(f"Embedding call failed: {response.status_code} - {response.text}")
+        client = get_http_client()
+        response = await client.post(
+            f"{api_base}/embeddings",
+            headers=headers,
+            json={"model": model, "input": bounded},
+            timeout=30.0,
+        )
+        if response.status_code == 200:
+            return response.json()["data"][0]["embedding"]
+        provider_stop = provider_stop_from_response(
+            response.status_code, response.text, response.headers.get("retry-after")
+        )
+        if provider_stop:
+            record_provider_stop(provider_stop, source="embedding")
+            raise provider_stop
+        logger.error(f"Embedding call failed: {response.status_code}")
+        raise RuntimeError(f"Embedding call failed: {response.status_code} - {response.text}")
     except ProviderStopError:
         raise
     except Exception as e:
@@ -97,30 +97,31 @@ async def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
 
     bounded = _bounded_inputs(texts)
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{api_base}/embeddings",
-                headers=headers,
-                json={"model": model, "input": bounded},
-            )
-            if response.status_code == 200:
-                # Pair vectors to input rows by the provider's explicit index,
-                # rather than assuming response ordering.
-                data = sorted(response.json().get("data", []), key=lambda item: item.get("index", 0))
-                vectors = [item["embedding"] for item in data]
-                if len(vectors) != len(texts):
-                    raise RuntimeError(
-                        f"Batch embedding response count mismatch: expected {len(texts)}, got {len(vectors)}"
-                    )
-                return vectors
-            provider_stop = provider_stop_from_response(
-                response.status_code, response.text, response.headers.get("retry-after")
-            )
-            if provider_stop:
-                record_provider_stop(provider_stop, source="embedding_backfill")
-                raise provider_stop
-            logger.error(f"Batch embedding failed: {response.status_code}")
-            raise RuntimeError(f"Batch embedding failed: {response.status_code} - {response.text}")
+        client = get_http_client()
+        response = await client.post(
+            f"{api_base}/embeddings",
+            headers=headers,
+            json={"model": model, "input": bounded},
+            timeout=60.0,
+        )
+        if response.status_code == 200:
+            # Pair vectors to input rows by the provider's explicit index,
+            # rather than assuming response ordering.
+            data = sorted(response.json().get("data", []), key=lambda item: item.get("index", 0))
+            vectors = [item["embedding"] for item in data]
+            if len(vectors) != len(texts):
+                raise RuntimeError(
+                    f"Batch embedding response count mismatch: expected {len(texts)}, got {len(vectors)}"
+                )
+            return vectors
+        provider_stop = provider_stop_from_response(
+            response.status_code, response.text, response.headers.get("retry-after")
+        )
+        if provider_stop:
+            record_provider_stop(provider_stop, source="embedding_backfill")
+            raise provider_stop
+        logger.error(f"Batch embedding failed: {response.status_code}")
+        raise RuntimeError(f"Batch embedding failed: {response.status_code} - {response.text}")
     except ProviderStopError:
         raise
     except Exception as e:
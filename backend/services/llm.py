@@ -3,8 +3,7 @@ import json
 import logging
 from typing import Optional
 
-import httpx
-
+from core.http import get_http_client
 from services.config_helpers import get_llm_config
 from services.job_safety import ProviderStopError, provider_stop_from_response, record_provider_stop
 
@@ -91,29 +90,30 @@ async def call_llm(
 
     # Use max_completion_tokens as it's supported by all major providers now
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            request_body = {
-                "model": model,
-                "messages": messages,
-                "temperature": 0.3,
-                "max_completion_tokens": max_tokens,
-            }
-
-            response = await client.post(
-                f"{api_base}/chat/completions",
-                headers=_build_llm_headers(api_key),
-                json=request_body,
-            )
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
-            provider_stop = provider_stop_from_response(
-                response.status_code, response.text, response.headers.get("retry-after")
-            )
-            if provider_stop:
-                record_provider_stop(provider_stop, source=f"llm:{task_type}")
-                raise provider_stop
-            logger.error(f"LLM call failed: {response.status_code} - {response.text}")
-            raise RuntimeError(f"LLM call failed: {response.status_code} - {response.text}")
+        client = get_http_client()
+        request_body = {
+            "model": model,
+            "messages": messages,
+            "temperature": 0.3,
+            "max_completion_tokens": max_tokens,
+        }
+
+        response = await client.post(
+            f"{api_base}/chat/completions",
+            headers=_build_llm_headers(api_key),
+            json=request_body,
+            timeout=60.0,
+        )
+        if response.status_code == 200:
+            return response.json()["choices"][0]["message"]["content"]
+        provider_stop = provider_stop_from_response(
+            response.status_code, response.text, response.headers.get("retry-after")
+        )
+        if provider_stop:
+            record_provider_stop(provider_stop, source=f"llm:{task_type}")
+            raise provider_stop
+        logger.error(f"LLM call failed: {response.status_code} - {response.text}")
+        raise RuntimeError(f"LLM call failed: {response.status_code} - {response.text}")
     except ProviderStopError:
         raise
     except Exception as e:
@@ -153,73 +153,75 @@ async def call_llm_with_thinking(
     think_steps = 0
 
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            while True:
-                request_body = {
-                    "model": model,
-                    "messages": messages,
-                    "temperature": 0.3,
-                    "max_completion_tokens": max_tokens,
-                    "tools": [_THINK_TOOL],
-                    "tool_choice": "auto",
-                }
+        client = get_http_client()
+        while True:
+            request_body = {
+                "model": model,
+                "messages": messages,
+                "temperature": 0.3,
+                "max_completion_tokens": max_tokens,
+                "tools": [_THINK_TOOL],
+                "tool_choice": "auto",
+            }
 
-                response = await client.post(
+            response = await client.post(
+                f"{api_base}/chat/completions",
+                headers=_build_llm_headers(api_key),
+                json=request_body,
+                timeout=120.0,
+            )
+            if response.status_code != 200:
+                provider_stop = provider_stop_from_response(
+                    response.status_code, response.text, response.headers.get("retry-after")
+                )
+                if provider_stop:
+                    record_provider_stop(provider_stop, source=f"llm:{task_type}")
+                    raise provider_stop
+                logger.error(f"LLM thinking call failed: {response.status_code} - {response.text}")
+                raise RuntimeError(f"LLM call failed: {response.status_code} - {response.text}")
+
+            choice = response.json()["choices"][0]
+            assistant_message = choice["message"]
+            tool_calls = assistant_message.get("tool_calls") or []
+
+            if not tool_calls:
+                return assistant_message.get("content") or ""
+
+            # Append assistant message and echo each think() call back as a tool result
+            messages.append(assistant_message)
+            for tc in tool_calls:
+                if tc["function"]["name"] == "think":
+                    reasoning = json.loads(tc["function"]["arguments"]).get("reasoning", "")
+                    think_steps += 1
+                    logger.debug(f"[think step {think_steps}] {reasoning[:120]}")
+                    messages.append({
+                        "role": "tool",
+                        "tool_call_id": tc["id"],
+                        "content": reasoning,
+                    })
+
+            if think_steps >= max_think_steps:
+                # Budget exhausted — force final answer without tools
+                final_resp = await client.post(
                     f"{api_base}/chat/completions",
                     headers=_build_llm_headers(api_key),
-                    json=request_body,
+                    json={
+                        "model": model,
+                        "messages": messages,
+                        "temperature": 0.3,
+                        "max_completion_tokens": max_tokens,
+                    },
+                    timeout=120.0,
                 )
-                if response.status_code != 200:
-                    provider_stop = provider_stop_from_response(
-                        response.status_code, response.text, response.headers.get("retry-after")
-                    )
-                    if provider_stop:
-                        record_provider_stop(provider_stop, source=f"llm:{task_type}")
-                        raise provider_stop
-                    logger.error(f"LLM thinking call failed: {response.status_code} - {response.text}")
-                    raise RuntimeError(f"LLM call failed: {response.status_code} - {response.text}")
-
-                choice = response.json()["choices"][0]
-                assistant_message = choice["message"]
-                tool_calls = assistant_message.get("tool_calls") or []
-
-                if not tool_calls:
-                    return assistant_message.get("content") or ""
-
-                # Append assistant message and echo each think() call back as a tool result
-                messages.append(assistant_message)
-                for tc in tool_calls:
-                    if tc["function"]["name"] == "think":
-                        reasoning = json.loads(tc["function"]["arguments"]).get("reasoning", "")
-                        think_steps += 1
-                        logger.debug(f"[think step {think_steps}] {reasoning[:120]}")
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tc["id"],
-                            "content": reasoning,
-                        })
-
-                if think_steps >= max_think_steps:
-                    # Budget exhausted — force final answer without tools
-                    final_resp = await client.post(
-                        f"{api_base}/chat/completions",
-                        headers=_build_llm_headers(api_key),
-                        json={
-                            "model": model,
-                            "messages": messages,
-                            "temperature": 0.3,
-                            "max_completion_tokens": max_tokens,
-                        },
-                    )
-                    if final_resp.status_code == 200:
-                        return final_resp.json()["choices"][0]["message"].get("content") or ""
-                    provider_stop = provider_stop_from_response(
-                        final_resp.status_code, final_resp.text, final_resp.headers.get("retry-after")
-                    )
-                    if provider_stop:
-                        record_provider_stop(provider_stop, source=f"llm:{task_type}")
-                        raise provider_stop
-                    raise RuntimeError(f"Final LLM call failed: {final_resp.status_code}")
+                if final_resp.status_code == 200:
+                    return final_resp.json()["choices"][0]["message"].get("content") or ""
+                provider_stop = provider_stop_from_response(
+                    final_resp.status_code, final_resp.text, final_resp.headers.get("retry-after")
+                )
+                if provider_stop:
+                    record_provider_stop(provider_stop, source=f"llm:{task_type}")
+                    raise provider_stop
+                raise RuntimeError(f"Final LLM call failed: {final_resp.status_code}")
 
     except ProviderStopError:
         raise
@@ -248,24 +250,25 @@ async def call_llm_vision(prompt: str, image_base64: str, mime_type: str = "imag
 
     # Use max_completion_tokens as it's supported by all major providers now
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            request_body = {"model": model, "messages": messages, "temperature": 0.1, "max_completion_tokens": 4000}
-
-            response = await client.post(
-                f"{api_base}/chat/completions",
-                headers=_build_llm_headers(api_key),
-                json=request_body,
-            )
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
-            provider_stop = provider_stop_from_response(
-                response.status_code, response.text, response.headers.get("retry-after")
-            )
-            if provider_stop:
-                record_provider_stop(provider_stop, source="vision")
-                raise provider_stop
-            logger.error(f"Vision LLM call failed: {response.status_code}")
-            raise RuntimeError(f"Vision LLM call failed: {response.status_code} - {response.text}")
+        client = get_http_client()
+        request_body = {"model": model, "messages": messages, "temperature": 0.1, "max_completion_tokens": 4000}
+
+        response = await client.post(
+            f"{api_base}/chat/completions",
+            headers=_build_llm_headers(api_key),
+            json=request_body,
+            timeout=120.0,
+        )
+        if response.status_code == 200:
+            return response.json()["choices"][0]["message"]["content"]
+        provider_stop = provider_stop_from_response(
+            response.status_code, response.text, response.headers.get("retry-after")
+        )
+        if provider_stop:
+            record_provider_stop(provider_stop, source="vision")
+            raise provider_stop
+        logger.error(f"Vision LLM call failed: {response.status_code}")
+        raise RuntimeError(f"Vision LLM call failed: {response.status_code} - {response.text}")
     except ProviderStopError:
         raise
     except Exception as e:
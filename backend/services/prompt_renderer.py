@@ -1,15 +1,36 @@
+import functools
 import logging
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 from core.db import get_db_context
 
 logger = logging.getLogger(__name__)
 
+# Stored variables in precedence order (account first, prompt overrides),
+# fetched in one round trip; the UNION ALL arm is only added when both apply.
+_SELECT_ACCOUNT_VARIABLES = "SELECT name, value FROM account_variables WHERE user_id = %s"
+_SELECT_PROMPT_VARIABLES = "SELECT name, value FROM prompt_variables WHERE prompt_id = %s AND version = %s"
+_SELECT_ALL_VARIABLES = (
+    "SELECT name, value, 0 AS src FROM account_variables WHERE user_id = %s "
+    "UNION ALL "
+    "SELECT name, value, 1 AS src FROM prompt_variables WHERE prompt_id = %s AND version = %s "
+    "ORDER BY src"
+)
+
+# {{ name }} placeholder; dots allow nested lookups such as {{entity.name}}.
+_VAR_RE = re.compile(r"\{\{\s*([a-zA-Z_][a-zA-Z0-9_.]*)\s*\}\}")
+
 def extract_variables(content: str) -> List[str]:
-    """Extract {{variable}} names from content."""
-    pattern = r"\{\{\s*([a-zA-Z_][a-zA-Z0-9_.]*)\s*\}\}"
-    return list(set(re.findall(pattern, content)))
+    """Extract {{variable}} names from content, deduplicated in first-seen order."""
+    return list(_extract_variables_cached(content))
+
+
+# Section bodies are re-scanned on every render of the same prompt; memoise by
+# content (tuples, so callers cannot mutate the cached result).
+@functools.lru_cache(maxsize=1024)
+def _extract_variables_cached(content: str) -> tuple:
+    return tuple(dict.fromkeys(_VAR_RE.findall(content)))
 
 
 def _flatten_dict(d: dict, parent_key: str = '', sep: str = '.') -> dict:
@@ -34,27 +55,41 @@ def inject_variables(
     version: str = "v1",
 ) -> str:
     """Inject variables with resolution order: account → prompt → entity profile → runtime."""
+    # Nothing to substitute: skip the variable queries and entity lookup entirely.
+    if "{{" not in content:
+        return content
+    return substitute_variables(content, resolve_variables(variables, prompt_id, user_id, version))[0]
+
+
+def resolve_variables(
+    variables: dict,
+    prompt_id: str = None,
+    user_id: str = None,
+    version: str = "v1",
+) -> dict:
+    """Resolve stored, entity and runtime values into one flat dot-notation map.
+
+    Callers rendering several sections resolve once and reuse the result with
+    substitute_variables() instead of re-querying per section.
+    """
     resolved = {}
 
-    # Bundle DB operations within a single connection
-    if user_id or prompt_id:
+    # 3. Account-level variables (lowest priority), then
+    # 2. prompt-level variables (medium priority) — one query, ordered by source
+    if user_id and prompt_id:
+        sql, params = _SELECT_ALL_VARIABLES, (user_id, prompt_id, version)
+    elif user_id:
+        sql, params = _SELECT_ACCOUNT_VARIABLES, (user_id,)
+    elif prompt_id:
+        sql, params = _SELECT_PROMPT_VARIABLES, (prompt_id, version)
+    else:
+        sql = None
+    if sql:
         with get_db_context() as conn:
             cursor = conn.cursor()
-
-            # 3. Account-level variables (lowest priority)
-            if user_id:
-                cursor.execute("SELECT name, value FROM account_variables WHERE user_id = %s", (user_id,))
-                for row in cursor.fetchall():
-                    resolved[row["name"]] = row["value"]
-
-            # 2. Prompt-level variables (medium priority)
-            if prompt_id:
-                cursor.execute(
-                    "SELECT name, value FROM prompt_variables WHERE prompt_id = %s AND version = %s",
-                    (prompt_id, version),
-                )
-                for row in cursor.fetchall():
-                    resolved[row["name"]] = row["value"]
+            cursor.execute(sql, params)
+            for row in cursor.fetchall():
+                resolved[row["name"]] = row["value"]
 
     # 1. Runtime values (highest priority)
     resolved.update(variables)
@@ -76,15 +111,25 @@ def inject_variables(
             logger.debug(f"Entity profile resolution skipped: {e}")
     
     # Flatten variables to support dot notation (e.g., {{entity.name}})
-    flat_resolved = _flatten_dict(resolved)
-    
-    result = content
-    for key, value in flat_resolved.items():
-        if value is not None:
-            # Need to replace {{ key }} handling spaces inside braces
-            result = re.sub(r"\{\{\s*" + re.escape(key) + r"\s*\}\}", str(value), result)
-            
-    return result
+    return _flatten_dict(resolved)
+
+
+def substitute_variables(content: str, flat_resolved: dict) -> Tuple[str, List[str]]:
+    """Replace placeholders in one pass; returns (content, unresolved names).
+
+    Unknown or None-valued placeholders are kept verbatim and reported in
+    first-seen order; substituted values are inserted literally (never re-scanned).
+    """
+    missing = {}
+
+    def _replace(match: re.Match) -> str:
+        value = flat_resolved.get(match.group(1))
+        if value is None:
+            missing[match.group(1)] = None
+            return match.group(0)
+        return str(value)
+
+    return _VAR_RE.sub(_replace, content), list(missing)
 
 
 def _resolve_entity_profile_variables(entity_type: str, entity_id: str) -> dict:
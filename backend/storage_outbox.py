@@ -0,0 +1,209 @@
+"""
+storage_outbox.py — Write-behind queue for GitHub prompt storage
+
+With GITHUB_WRITE_BEHIND=true, section writes for users in GitHub storage
+mode are recorded in the storage_outbox table and acknowledged with 202
+instead of waiting on GitHub. A lifespan-managed task drains the table,
+one row at a time per prompt (so writes land in the order they were made)
+and prompts in parallel, retrying transient failures with backoff.
+
+Reads still come from GitHub, so a queued change is visible once drained.
+A row that keeps failing is parked as 'failed' and kept for inspection; it
+no longer holds back later writes for the same prompt.
+"""
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import orjson
+
+from core.db import get_db_context
+from core.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 2.0
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 5
+MAX_BACKOFF_SECONDS = 300
+# A 'running' row older than this was claimed by a worker that died mid-write
+STALE_CLAIM_SECONDS = 600
+
+# Head-of-queue rows only: a row is claimable when no earlier row for the
+# same prompt is still waiting (done rows are deleted, failed rows are parked).
+_CLAIM_BATCH = """
+    UPDATE storage_outbox SET status = 'running', claimed_at = %s
+    WHERE id IN (
+        SELECT o.id FROM storage_outbox o
+        WHERE ((o.status = 'pending' AND o.next_attempt_at <= %s)
+               OR (o.status = 'running' AND o.claimed_at < %s))
+          AND NOT EXISTS (
+              SELECT 1 FROM storage_outbox e
+              WHERE e.prompt_id = o.prompt_id AND e.id < o.id AND e.status <> 'failed'
+          )
+        ORDER BY o.id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, user_id, prompt_id, op, payload, attempts
+"""
+
+# Section files are "<order>_<name>.md"; unnumbered files sort as 99, as in
+# the section listing.
+_SECTION_ORDER_RE = re.compile(r"^(\d+)_.+\.md$")
+
+_task_handle = None
+
+
+def write_behind_enabled(user_id: str) -> bool:
+    """True when section writes for user_id should be queued rather than awaited."""
+    if os.environ.get("GITHUB_WRITE_BEHIND", "false").lower() not in {"1", "true", "yes"}:
+        return False
+    from storage_service import get_storage_mode
+    return get_storage_mode(user_id) == "github"
+
+
+def enqueue_storage_write(cursor, user_id: str, prompt_id: str, op: str, payload: dict) -> int:
+    """Queue a write on the caller's cursor; it commits (or rolls back) with the caller's transaction."""
+    now = utcnow()
+    cursor.execute(
+        "INSERT INTO storage_outbox (user_id, prompt_id, op, payload, status, attempts, next_attempt_at, created_at) "
+        "VALUES (%s, %s, %s, %s, 'pending', 0, %s, %s) RETURNING id",
+        (user_id, prompt_id, op, orjson.dumps(payload).decode(), now, now),
+    )
+    return cursor.fetchone()["id"]
+
+
+def next_section_order(filenames: list) -> int:
+    """The order for a section appended after the given section filenames."""
+    orders = [int(m.group(1)) if m else 99 for m in map(_SECTION_ORDER_RE.match, filenames)]
+    return max(orders, default=0) + 1
+
+
+async def _update_manifest_sections(storage, folder_path: str, version: str, add: str = None, remove: str = None):
+    content_data = await storage.get_prompt_content(folder_path, version)
+    if not content_data or "manifest" not in content_data:
+        return
+    manifest = content_data["manifest"]
+    sections = manifest.setdefault("sections", [])
+    if add and add not in sections:
+        sections.append(add)
+    elif remove and remove in sections:
+        sections.remove(remove)
+    else:
+        return
+    await storage.update_manifest(folder_path, manifest, version)
+
+
+async def apply_storage_write(storage, op: str, payload: dict) -> bool:
+    """Run one logical section write against a storage backend.
+
+    Used both inline by the section routes and by the outbox drain, so a
+    queued write does exactly what the synchronous path would have done.
+    Returns False when the target is missing (not worth retrying).
+    """
+    folder_path, version = payload["folder_path"], payload["version"]
+    if op == "create_section":
+        filename = payload.get("filename")
+        if filename is None:
+            # Queued without an explicit order: number it against the manifest
+            # as it stands now, after every earlier write for this prompt.
+            manifest = await storage.get_manifest(folder_path, version) or {}
+            filename = f"{str(next_section_order(manifest.get('sections', []))).zfill(2)}_{payload['name']}.md"
+        if not await storage.create_section(folder_path, filename, payload["content"], version):
+            return False
+        await _update_manifest_sections(storage, folder_path, version, add=filename)
+        return True
+    if op == "update_section":
+        return await storage.update_section(folder_path, payload["filename"], payload["content"], version)
+    if op == "delete_section":
+        if not await storage.delete_section(folder_path, payload["filename"], version):
+            return False
+        await _update_manifest_sections(storage, folder_path, version, remove=payload["filename"])
+        return True
+    if op == "reorder_sections":
+        return await storage.reorder_sections(folder_path, payload["renames"], payload["section_order"], version)
+    raise ValueError(f"Unknown storage op: {op}")
+
+
+def _claim_batch() -> list:
+    now = datetime.now(timezone.utc)
+    stale = (now - timedelta(seconds=STALE_CLAIM_SECONDS)).isoformat()
+    with get_db_context() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_CLAIM_BATCH, (now.isoformat(), now.isoformat(), stale, BATCH_SIZE))
+        return sorted((dict(row) for row in cursor.fetchall()), key=lambda row: row["id"])
+
+
+def _finish_row(row: dict, error: str = None, retry: bool = True) -> None:
+    with get_db_context() as conn:
+        cursor = conn.cursor()
+        if error is None:
+            cursor.execute("DELETE FROM storage_outbox WHERE id = %s", (row["id"],))
+            return
+        attempts = row["attempts"] + 1
+        if retry and attempts < MAX_ATTEMPTS:
+            status = "pending"
+            logger.warning(f"Storage outbox row {row['id']} ({row['op']}) failed, attempt {attempts}: {error}")
+        else:
+            status = "failed"
+            logger.error(f"Storage outbox row {row['id']} ({row['op']}) parked as failed: {error}")
+        delay = min(2 ** attempts, MAX_BACKOFF_SECONDS)
+        next_attempt_at = (datetime.now(timezone.utc) + timedelta(seconds=delay)).isoformat()
+        cursor.execute(
+            "UPDATE storage_outbox SET status = %s, attempts = %s, next_attempt_at = %s, last_error = %s WHERE id = %s",
+            (status, attempts, next_attempt_at, error[:1000], row["id"]),
+        )
+
+
+async def _run_row(row: dict) -> None:
+    from storage_service import get_storage_service
+
+    error, retry = None, True
+    try:
+        storage = get_storage_service(row["user_id"])
+        if not await apply_storage_write(storage, row["op"], orjson.loads(row["payload"])):
+            error, retry = "target not found in storage", False
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    await asyncio.to_thread(_finish_row, row, error, retry)
+
+
+async def drain_storage_outbox() -> int:
+    """Claim and apply one batch (at most one row per prompt). Returns rows processed."""
+    rows = await asyncio.to_thread(_claim_batch)
+    if rows:
+        await asyncio.gather(*(_run_row(row) for row in rows))
+    return len(rows)
+
+
+async def _drain_loop():
+    while True:
+        try:
+            if await drain_storage_outbox():
+                continue
+        except Exception as e:
+            logger.warning(f"Storage outbox drain failed: {e}")
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+
+async def start_storage_outbox_worker():
+    """Start the drain task. Called once during app startup (lifespan)."""
+    global _task_handle
+    if _task_handle and not _task_handle.done():
+        return
+    _task_handle = asyncio.create_task(_drain_loop())
+
+
+async def stop_storage_outbox_worker():
+    """Cancel the drain task; a row interrupted mid-write is reclaimed once its claim goes stale."""
+    global _task_handle
+    if _task_handle and not _task_handle.done():
+        _task_handle.cancel()
+        try:
+            await _task_handle
+        except asyncio.CancelledError:
+            pass
+    _task_handle = None
@@ -10,21 +10,41 @@ from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 from core.safe_paths import safe_join, validate_relative_storage_path, validate_storage_component
+import asyncio
 import json
 import os
 import base64
-import httpx
-from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Import shared DB utilities from core package (single source of truth)
 from core.db import get_db_context, get_github_settings
+from core.cache import TTLCache
+from core.github import github_request
+from core.utils import utcnow
 
 ROOT_DIR = Path(__file__).parent
 LOCAL_STORAGE_PATH = ROOT_DIR / "local_prompts"
 
+# (url, accept) -> (etag, payload) for GitHub Contents GETs; bounded, and the
+# TTL only limits memory since every hit is revalidated with If-None-Match.
+_etag_cache = TTLCache(maxsize=2048, ttl=3600)
+
+# Every file of one version folder (manifest and sections) in a single
+# GraphQL round-trip, instead of the manifest GET followed by one GET per section.
+_VERSION_FILES_QUERY = """
+query($owner: String!, $name: String!, $expression: String!) {
+  repository(owner: $owner, name: $name) {
+    object(expression: $expression) {
+      ... on Tree {
+        entries { name oid object { ... on Blob { text isTruncated } } }
+      }
+    }
+  }
+}
+"""
+
 
 
 def get_storage_mode(user_id: str) -> str:
@@ -134,6 +154,39 @@ class StorageService(ABC):
         
         return "\n\n".join(rendered)
 
+    async def get_manifest(self, folder_path: str, version: str = "v1") -> Optional[Dict]:
+        """Read just the manifest, without loading section bodies."""
+        content = await self.get_prompt_content(folder_path, version)
+        return content["manifest"] if content else None
+
+    async def reorder_sections(
+        self,
+        folder_path: str,
+        renames: Dict[str, str],
+        section_order: List[str],
+        version: str = "v1"
+    ) -> bool:
+        """Rename sections (old -> new filename) and rewrite the manifest order.
+
+        Generic fallback built from the per-file primitives; backends that can
+        write several files at once override it.
+        """
+        content = await self.get_prompt_content(folder_path, version)
+        if not content:
+            return False
+        existing = {s["filename"]: s["content"] for s in content.get("sections", [])}
+        # Write every target before deleting, so swapped names are not lost
+        for old_filename, new_filename in renames.items():
+            if old_filename in existing:
+                await self.create_section(folder_path, new_filename, existing[old_filename], version)
+        targets = set(renames.values())
+        for old_filename in renames:
+            if old_filename in existing and old_filename not in targets:
+                await self.delete_section(folder_path, old_filename, version)
+        manifest = content["manifest"]
+        manifest["sections"] = section_order
+        return await self.update_manifest(folder_path, manifest, version)
+
 
 class GitHubStorageService(StorageService):
     """Storage service that uses GitHub repository for prompt storage."""
@@ -160,9 +213,14 @@ class GitHubStorageService(StorageService):
         self, 
         method: str, 
         endpoint: str, 
-        data: dict = None
+        data: dict = None,
+        raw: bool = False
     ) -> Any:
-        """Make authenticated request to GitHub API."""
+        """Make authenticated request to GitHub API.
+
+        raw=True asks the Contents API for the file body itself (returned as
+        str) instead of base64 JSON: fewer bytes on the wire and no decode.
+        """
         if not self.settings or not self.settings.get("github_token"):
             raise ValueError("GitHub not configured")
         
@@ -171,25 +229,99 @@ class GitHubStorageService(StorageService):
         
         headers = {
             "Authorization": f"Bearer {self.settings['github_token']}", # Switched to Bearer
-            "Accept": "application/vnd.github.v3+json"
+            "Accept": "application/vnd.github.raw" if raw else "application/vnd.github.v3+json"
         }
         
-        async with httpx.AsyncClient() as client:
-            if method == "GET":
-                response = await client.get(url, headers=headers)
-            elif method == "PUT":
-                response = await client.put(url, headers=headers, json=data)
-            elif method == "DELETE":
-                response = await client.delete(url, headers=headers, json=data)
-            else:
-                raise ValueError(f"Unsupported method: {method}")
+        if method not in ("GET", "POST", "PUT", "PATCH", "DELETE"):
+            raise ValueError(f"Unsupported method: {method}")
+        # Conditional GET: GitHub answers 304 (free of rate-limit cost) while
+        # the file is unchanged, so a stale entry can never be served.
+        cache_key = (url, headers["Accept"])
+        cached = _etag_cache.get(cache_key) if method == "GET" else None
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        # Every verb goes through request(): the Contents API needs message/sha
+        # in the body even on DELETE.
+        response = await github_request(method, url, headers, json=data)
             
-            if response.status_code in [200, 201]:
-                return response.json()
-            elif response.status_code == 404:
-                return None
-            else:
-                raise Exception(f"GitHub API error: {response.status_code} - {response.text}")
+        if response.status_code == 304 and cached:
+            return cached[1]
+        if response.status_code in [200, 201]:
+            payload = response.text if raw else response.json()
+            if method == "GET" and response.headers.get("ETag"):
+                _etag_cache.set(cache_key, (response.headers["ETag"], payload))
+            return payload
+        elif response.status_code == 404:
+            return None
+        elif response.status_code == 409 and method == "GET":
+            # "Git Repository is empty": nothing to read yet
+            return None
+        else:
+            raise Exception(f"GitHub API error: {response.status_code} - {response.text}")
+
+    @staticmethod
+    def _tree_entry(path: str, content: str = None, sha: str = None, delete: bool = False) -> Dict:
+        """Git tree entry: inline content, an existing blob sha, or a deletion."""
+        entry = {"path": path, "mode": "100644", "type": "blob"}
+        if delete:
+            entry["sha"] = None
+        elif sha is not None:
+            entry["sha"] = sha
+        else:
+            entry["content"] = content
+        return entry
+
+    async def _commit_tree(self, tree: List[Dict], message: str, absent_path: str = None) -> str:
+        """Apply tree entries on top of the default branch as a single commit.
+
+        Git Data API round: ref -> commit -> new tree -> new commit -> move
+        ref. Costs the same handful of calls however many files change, where
+        the Contents API makes one commit per file. Returns the commit sha.
+
+        With absent_path, raises FileExistsError if that path already exists
+        at the head being committed on. The ref update is not forced, so a
+        head that moved in between fails the commit instead of overwriting.
+        """
+        repo_info = await self._github_api_request("GET", "")
+        branch = repo_info["default_branch"]
+        ref = await self._github_api_request("GET", f"/git/ref/heads/{branch}")
+        if not ref:
+            return await self._commit_first(tree, message, branch)
+        head_sha = ref["object"]["sha"]
+        if absent_path and await self._github_api_request("GET", f"/contents/{absent_path}?ref={head_sha}"):
+            raise FileExistsError(absent_path)
+        head_commit = await self._github_api_request("GET", f"/git/commits/{head_sha}")
+
+        new_tree = await self._github_api_request("POST", "/git/trees", {
+            "base_tree": head_commit["tree"]["sha"],
+            "tree": tree
+        })
+        new_commit = await self._github_api_request("POST", "/git/commits", {
+            "message": message,
+            "tree": new_tree["sha"],
+            "parents": [head_sha]
+        })
+        await self._github_api_request("PATCH", f"/git/refs/heads/{branch}", {"sha": new_commit["sha"]})
+        return new_commit["sha"]
+
+    async def _commit_first(self, tree: List[Dict], message: str, branch: str) -> str:
+        """Start an empty repository, which the Git Data API refuses to write to.
+
+        The first file goes through the Contents API (creating the branch);
+        the remaining entries then follow as one ordinary tree commit.
+        """
+        files = [entry for entry in tree if "content" in entry]
+        if not files:
+            raise ValueError("Cannot start an empty repository without file content")
+        first, rest = files[0], files[1:]
+        result = await self._github_api_request("PUT", f"/contents/{first['path']}", {
+            "message": message,
+            "content": base64.b64encode(first["content"].encode()).decode(),
+            "branch": branch,
+        })
+        if rest:
+            return await self._commit_tree(rest, message)
+        return result["commit"]["sha"]
     
     async def create_prompt(
         self, 
@@ -199,61 +331,102 @@ class GitHubStorageService(StorageService):
         sections: List[Dict],
         variables: Dict
     ) -> bool:
-        """Create a new prompt in GitHub."""
+        """Create a new prompt in GitHub (manifest and all sections in one commit)."""
         version_path = self._version_path(folder_path, "v1")
         
-        # Create manifest
+        section_files = [
+            {
+                "filename": section.get("filename", f"{section.get('order', 1):02d}_{section.get('name', 'section')}.md"),
+                "content": section.get("content", "")
+            }
+            for section in sections
+        ]
+        for section in section_files:
+            validate_storage_component(section["filename"], "section filename")
+        
         manifest = {
             "prompt_id": name.lower().replace(" ", "-"),
             "name": name,
             "description": description,
             "version": "v1",
-            "sections": [],
+            "sections": [s["filename"] for s in section_files],
             "variables": variables
         }
         
-        manifest_content = base64.b64encode(
-            json.dumps(manifest, indent=2).encode()
-        ).decode()
-        
-        await self._github_api_request("PUT", f"/contents/{version_path}/manifest.json", {
-            "message": f"Create prompt: {name}",
-            "content": manifest_content
-        })
-        
-        # Create sections
-        for section in sections:
-            filename = section.get("filename", f"{section.get('order', 1):02d}_{section.get('name', 'section')}.md")
-            content = base64.b64encode(section.get("content", "").encode()).decode()
-            
-            await self._github_api_request("PUT", f"/contents/{version_path}/{filename}", {
-                "message": f"Add section: {filename}",
-                "content": content
-            })
-            
-            manifest["sections"].append(filename)
-        
-        # Update manifest with section list
-        if sections:
-            manifest_response = await self._github_api_request(
-                "GET", f"/contents/{version_path}/manifest.json"
-            )
-            if manifest_response:
-                manifest_content = base64.b64encode(
-                    json.dumps(manifest, indent=2).encode()
-                ).decode()
-                await self._github_api_request("PUT", f"/contents/{version_path}/manifest.json", {
-                    "message": "Update manifest with sections",
-                    "content": manifest_content,
-                    "sha": manifest_response["sha"]
-                })
-        
+        tree = [self._tree_entry(f"{version_path}/{s['filename']}", content=s["content"]) for s in section_files]
+        tree.append(self._tree_entry(f"{version_path}/manifest.json", content=json.dumps(manifest, indent=2)))
+        # Refuse an existing folder: the caller may delete it again on failure
+        await self._commit_tree(tree, f"Create prompt: {name}", absent_path=version_path.rsplit("/", 1)[0])
         return True
     
+    async def _get_version_files(self, version_path: str) -> Optional[Dict[str, tuple]]:
+        """Map each file in version_path to (blob sha, text) via one GraphQL query.
+
+        text is None for blobs GraphQL will not inline (binary or truncated).
+        Returns None when the folder does not exist on the default branch.
+        """
+        owner, repo = self._get_repo_info()
+        headers = {"Authorization": f"Bearer {self.settings['github_token']}"}
+        response = await github_request("POST", "/graphql", headers, json={
+            "query": _VERSION_FILES_QUERY,
+            "variables": {"owner": owner, "name": repo, "expression": f"HEAD:{version_path}"},
+        })
+        payload = response.json() if response.status_code == 200 else {}
+        if "data" not in payload or payload.get("errors"):
+            raise Exception(f"GitHub GraphQL error: {response.status_code} - {response.text}")
+        tree = ((payload["data"] or {}).get("repository") or {}).get("object")
+        if not tree or "entries" not in tree:
+            return None
+        files = {}
+        for entry in tree["entries"]:
+            blob = entry.get("object") or {}
+            files[entry["name"]] = (entry["oid"], None if blob.get("isTruncated") else blob.get("text"))
+        return files
+
     async def get_prompt_content(self, folder_path: str, version: str = "v1") -> Optional[Dict]:
-        """Get prompt content from GitHub."""
+        """Get prompt content from GitHub: one GraphQL query, REST if that fails."""
         version_path = self._version_path(folder_path, version)
-        
+        if not self.settings or not self.settings.get("github_token"):
+            raise ValueError("GitHub not configured")
+        try:
+            files = await self._get_version_files(version_path)
+        except Exception as e:
+            logger.warning(f"GraphQL fetch of {version_path} failed, using the Contents API: {e}")
+            return await self._get_prompt_content_rest(version_path)
+        if not files or "manifest.json" not in files:
+            return None
+        manifest_sha, manifest_text = files["manifest.json"]
+        if manifest_text is None:
+            return await self._get_prompt_content_rest(version_path)
+        manifest = json.loads(manifest_text)
+
+        section_files = manifest.get("sections", [])
+        for section_file in section_files:
+            validate_storage_component(section_file, "section filename")
+        # Blobs GraphQL would not inline are fetched raw, concurrently
+        oversized = [f for f in section_files if f in files and files[f][1] is None]
+        bodies = {name: text for name, (_, text) in files.items()}
+        bodies.update(zip(oversized, await asyncio.gather(*(
+            self._github_api_request("GET", f"/contents/{version_path}/{section_file}", raw=True)
+            for section_file in oversized
+        ))))
+        sections = []
+        for section_file in section_files:
+            section_body = bodies.get(section_file)
+            if section_body is not None:
+                sections.append({
+                    "filename": section_file,
+                    "content": section_body
+                })
+
+        return {
+            "manifest": manifest,
+            "sections": sections,
+            "sha": manifest_sha
+        }
+
+    async def _get_prompt_content_rest(self, version_path: str) -> Optional[Dict]:
+        """Contents API fallback: the manifest, then every section concurrently."""
         # Get manifest
         manifest_data = await self._github_api_request(
             "GET", f"/contents/{version_path}/manifest.json"
@@ -265,18 +438,20 @@ class GitHubStorageService(StorageService):
             base64.b64decode(manifest_data["content"]).decode()
         )
         
-        # Get sections
-        sections = []
-        for section_file in manifest.get("sections", []):
+        # Get sections — fetched concurrently, kept in manifest order
+        section_files = manifest.get("sections", [])
+        for section_file in section_files:
             validate_storage_component(section_file, "section filename")
-            section_data = await self._github_api_request(
-                "GET", f"/contents/{version_path}/{section_file}"
-            )
-            if section_data:
+        section_bodies = await asyncio.gather(*(
+            self._github_api_request("GET", f"/contents/{version_path}/{section_file}", raw=True)
+            for section_file in section_files
+        ))
+        sections = []
+        for section_file, section_body in zip(section_files, section_bodies):
+            if section_body is not None:
                 sections.append({
                     "filename": section_file,
-                    "content": base64.b64decode(section_data["content"]).decode(),
-                    "sha": section_data.get("sha")
+                    "content": section_body
                 })
         
         return {
@@ -285,21 +460,30 @@ class GitHubStorageService(StorageService):
             "sha": manifest_data.get("sha")
         }
     
+    async def get_manifest(self, folder_path: str, version: str = "v1") -> Optional[Dict]:
+        """Get the manifest from GitHub (one ETag-revalidated GET)."""
+        version_path = self._version_path(folder_path, version)
+        manifest_data = await self._github_api_request(
+            "GET", f"/contents/{version_path}/manifest.json"
+        )
+        if not manifest_data:
+            return None
+        return json.loads(base64.b64decode(manifest_data["content"]).decode())
+    
     async def get_section(self, folder_path: str, filename: str, version: str = "v1") -> Optional[Dict]:
         """Get a specific section from GitHub."""
         version_path = self._version_path(folder_path, version)
         validate_storage_component(filename, "section filename")
-        section_data = await self._github_api_request(
-            "GET", f"/contents/{version_path}/{filename}"
+        section_body = await self._github_api_request(
+            "GET", f"/contents/{version_path}/{filename}", raw=True
         )
         
-        if not section_data:
+        if section_body is None:
             return None
         
         return {
             "filename": filename,
-            "content": base64.b64decode(section_data["content"]).decode(),
-            "sha": section_data.get("sha")
+            "content": section_body
         }
     
     async def create_section(
@@ -397,6 +581,42 @@ class GitHubStorageService(StorageService):
         })
         return True
     
+    async def reorder_sections(
+        self,
+        folder_path: str,
+        renames: Dict[str, str],
+        section_order: List[str],
+        version: str = "v1"
+    ) -> bool:
+        """Rename sections and rewrite the manifest in a single commit."""
+        version_path = self._version_path(folder_path, version)
+        for filename in (*renames, *renames.values(), *section_order):
+            validate_storage_component(filename, "section filename")
+
+        manifest_data, listing = await asyncio.gather(
+            self._github_api_request("GET", f"/contents/{version_path}/manifest.json"),
+            self._github_api_request("GET", f"/contents/{version_path}"),
+        )
+        if not manifest_data:
+            return False
+        manifest = json.loads(base64.b64decode(manifest_data["content"]).decode())
+        manifest["sections"] = section_order
+
+        # Renamed files reuse their existing blobs; nothing is re-uploaded
+        blob_shas = {item["name"]: item["sha"] for item in listing or [] if item.get("type") == "file"}
+        targets = set(renames.values())
+        tree = []
+        for old_filename, new_filename in renames.items():
+            if old_filename in blob_shas:
+                tree.append(self._tree_entry(f"{version_path}/{new_filename}", sha=blob_shas[old_filename]))
+        for old_filename in renames:
+            if old_filename in blob_shas and old_filename not in targets:
+                tree.append(self._tree_entry(f"{version_path}/{old_filename}", delete=True))
+        tree.append(self._tree_entry(f"{version_path}/manifest.json", content=json.dumps(manifest, indent=2)))
+
+        await self._commit_tree(tree, f"Reorder sections: {version_path}")
+        return True
+
     async def delete_prompt(self, folder_path: str) -> bool:
         """Delete prompt from GitHub (deletes all files recursively)."""
         # GitHub doesn't have a recursive delete, so we need to delete each file
@@ -466,9 +686,12 @@ class LocalStorageService(StorageService):
         sections: List[Dict],
         variables: Dict
     ) -> bool:
-        """Create a new prompt locally."""
+        """Create a new prompt locally; FileExistsError if the folder is already there."""
         version_path = self._get_prompt_path(folder_path)
-        version_path.mkdir(parents=True, exist_ok=True)
+        # Atomic claim of the folder: the caller may delete it again on failure,
+        # so it must never be one another prompt already owns.
+        version_path.parent.mkdir(parents=True, exist_ok=False)
+        version_path.mkdir()
         
         # Create manifest
         manifest = {
@@ -478,8 +701,8 @@ class LocalStorageService(StorageService):
             "version": "v1",
             "sections": [],
             "variables": variables,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "created_at": utcnow(),
+            "updated_at": utcnow()
         }
         
         # Create sections and update manifest
@@ -528,6 +751,14 @@ class LocalStorageService(StorageService):
             "sections": sections
         }
     
+    async def get_manifest(self, folder_path: str, version: str = "v1") -> Optional[Dict]:
+        """Get the manifest from local filesystem."""
+        manifest_path = self._get_prompt_path(folder_path, version) / "manifest.json"
+        if not manifest_path.exists():
+            return None
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    
     async def get_section(self, folder_path: str, filename: str, version: str = "v1") -> Optional[Dict]:
         """Get a specific section from local filesystem."""
         version_path = self._get_prompt_path(folder_path, version)
@@ -584,7 +815,7 @@ class LocalStorageService(StorageService):
         if manifest_path.exists():
             with open(manifest_path, "r", encoding="utf-8") as f:
                 manifest = json.load(f)
-            manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+            manifest["updated_at"] = utcnow()
             with open(manifest_path, "w", encoding="utf-8") as f:
                 json.dump(manifest, f, indent=2)
         
@@ -617,7 +848,7 @@ class LocalStorageService(StorageService):
         version_path = self._get_prompt_path(folder_path, version)
         manifest_path = version_path / "manifest.json"
         
-        manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+        manifest["updated_at"] = utcnow()
         
         with open(manifest_path, "w", encoding="utf-8") as f:
             json.dump(manifest, f, indent=2)
@@ -15,6 +15,7 @@ import hashlib
 import json
 import os
 import secrets
+from contextlib import contextmanager
 
 import pytest
 import requests
@@ -93,3 +94,49 @@ def agent(agent_api_key):
         "X-API-Key": agent_api_key,
     })
     return s
+
+
+
+# ─────────────────────────────────────────────
+# In-process fakes for unit tests (no server, no database)
+# ─────────────────────────────────────────────
+
+class FakeCursor:
+    """Records every execute(); each fetchone/fetchall call pops the next queued result."""
+
+    def __init__(self, results=()):
+        self.queries = []
+        self.results = list(results)
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, params))
+
+    def fetchone(self):
+        return self.results.pop(0) if self.results else None
+
+    def fetchall(self):
+        return self.results.pop(0) if self.results else []
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Patch ``module.get_db_context`` with a fake connection; returns its FakeCursor.
+
+    Usage: ``cursor = fake_db(module, results=[row, [rows]])``.
+    """
+    def install(module, results=()):
+        cursor = FakeCursor(results)
+
+        class Conn:
+            def cursor(self):
+                return cursor
+
+        @contextmanager
+        def fake_db_context():
+            yield Conn()
+
+        monkeypatch.setattr(module, "get_db_context", fake_db_context)
+        return cursor
+
+    return install
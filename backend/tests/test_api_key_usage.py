@@ -0,0 +1,22 @@
+import core.api_key_usage as usage
+
+
+def test_flush_coalesces_pending_uses_into_one_batch(monkeypatch, fake_db):
+    batches = []
+
+    def fake_execute_values(cursor, sql, rows, page_size=100):
+        assert page_size >= len(rows)
+        batches.append(sorted(rows, key=lambda row: row[1]))
+
+    stamps = iter([1.0, 2.0, 3.0])
+    fake_db(usage)
+    monkeypatch.setattr(usage, "execute_values", fake_execute_values)
+    monkeypatch.setattr(usage, "_clock", lambda: next(stamps))
+
+    usage.record_api_key_use("a")
+    usage.record_api_key_use("b")
+    usage.record_api_key_use("a")
+
+    assert usage.flush_api_key_usage() == 2
+    assert batches == [[("1970-01-01T00:00:03+00:00", "a"), ("1970-01-01T00:00:02+00:00", "b")]]
+    assert usage.flush_api_key_usage() == 0
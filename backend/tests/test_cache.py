@@ -0,0 +1,20 @@
+import core.cache as cache_module
+from core.cache import TTLCache
+
+
+def test_ttl_cache_expires_entries_and_stays_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=10)
+
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=1)
+    assert cache.get("a") == 1 and cache.get("b") == 2
+
+    now[0] += 5
+    assert cache.get("b") is None
+    cache.set("c", 3)
+    cache.set("d", 4)
+    assert cache.get("a") is None
+    assert (cache.get("c"), cache.get("d")) == (3, 4)
+    assert len(cache) == 2
@@ -13,3 +13,14 @@ def test_acquire_connection_waits_then_reports_a_bounded_error(monkeypatch):
 
     with pytest.raises(PoolError, match="after waiting"):
         db_pool.acquire_connection("postgresql://example", timeout=0.001)
+
+
+def test_connect_kwargs_only_set_known_synchronous_commit_levels(monkeypatch):
+    monkeypatch.delenv("DB_SYNCHRONOUS_COMMIT", raising=False)
+    assert db_pool._connect_kwargs() == {}
+
+    monkeypatch.setenv("DB_SYNCHRONOUS_COMMIT", "OFF")
+    assert db_pool._connect_kwargs() == {"options": "-c synchronous_commit=off"}
+
+    monkeypatch.setenv("DB_SYNCHRONOUS_COMMIT", "off; drop table users")
+    assert db_pool._connect_kwargs() == {}
@@ -0,0 +1,28 @@
+import time
+from types import SimpleNamespace
+
+import core.github as gh
+
+
+def _response(status, headers=None, text=""):
+    return SimpleNamespace(status_code=status, headers=headers or {}, text=text)
+
+
+def test_rate_limit_wait_reads_retry_after_and_reset():
+    assert gh._rate_limit_wait(_response(200)) is None
+    assert gh._rate_limit_wait(_response(403, text="Resource not accessible")) is None
+    assert gh._rate_limit_wait(_response(429, {"Retry-After": "7"})) == 7.0
+    assert gh._rate_limit_wait(_response(403, text="You have exceeded a secondary rate limit")) == 60.0
+
+    reset = str(int(time.time()) + 30)
+    wait = gh._rate_limit_wait(_response(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}))
+    assert 0 < wait <= 30
+
+
+def test_low_budget_is_remembered_per_token_until_it_recovers():
+    reset = str(int(time.time()) + 30)
+    gh._note_budget("k", _response(200, {"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": reset}))
+    assert gh._exhausted_until["k"] == float(reset)
+
+    gh._note_budget("k", _response(200, {"X-RateLimit-Remaining": "4000", "X-RateLimit-Reset": reset}))
+    assert "k" not in gh._exhausted_until
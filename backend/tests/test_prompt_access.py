@@ -0,0 +1,21 @@
+import pytest
+from fastapi import HTTPException
+
+import routes.prompt_access as prompt_access
+
+
+def test_prompt_folder_is_cached_and_still_owner_checked(fake_db):
+    location = {"user_id": "owner", "folder_path": "prompts/agent"}
+    cursor = fake_db(prompt_access, results=[location, location])
+    prompt_access._prompt_locations.clear()
+
+    assert prompt_access.require_prompt_folder("p1", "owner") == "prompts/agent"
+    assert prompt_access.require_prompt_folder("p1", "owner") == "prompts/agent"
+    with pytest.raises(HTTPException) as exc:
+        prompt_access.require_prompt_folder("p1", "someone-else")
+    assert exc.value.status_code == 404
+    assert [params for _, params in cursor.queries] == [("p1",)]
+
+    prompt_access.forget_prompt_location("p1")
+    prompt_access.require_prompt_folder("p1", "owner")
+    assert len(cursor.queries) == 2
@@ -0,0 +1,30 @@
+from services.prompt_renderer import extract_variables, inject_variables
+
+
+def test_inject_variables_substitutes_in_one_pass_and_keeps_unknowns():
+    content = "Hi {{ name }}, {{entity.tier}} path {{path}} {{missing}} {{ name}}"
+    rendered = inject_variables(
+        content,
+        {"name": "{{path}}", "entity": {"tier": "gold"}, "path": r"C:\new\dir"},
+    )
+
+    assert rendered == r"Hi {{path}}, gold path C:\new\dir {{missing}} {{path}}"
+    assert extract_variables(content) == ["name", "entity.tier", "path", "missing"]
+
+
+def test_inject_variables_returns_placeholder_free_content_without_db(monkeypatch):
+    import services.prompt_renderer as renderer
+
+    monkeypatch.setattr(renderer, "get_db_context", None)
+    assert inject_variables("plain text", {}, prompt_id="p1", user_id="u1") == "plain text"
+
+
+def test_substitute_variables_reports_unresolved_names_in_order():
+    from services.prompt_renderer import substitute_variables
+
+    rendered, missing = substitute_variables(
+        "{{b}} {{ a }} {{known}} {{b}} {{none}}", {"known": "{{a}}", "none": None}
+    )
+
+    assert rendered == "{{b}} {{ a }} {{a}} {{b}} {{none}}"
+    assert missing == ["b", "a", "none"]
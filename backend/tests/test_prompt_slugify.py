@@ -0,0 +1,17 @@
+import pytest
+
+from routes.prompts import slugify
+
+
+@pytest.mark.parametrize(
+    ("name", "slug"),
+    [
+        ("  My Prompt  ", "my_prompt"),
+        ("Sales - Q3 / EMEA!", "sales_q3_emea"),
+        ("v1.2_final", "v12_final"),
+        ("a -.- b", "a_b"),
+        ("Café déjà", "café_déjà"),
+    ],
+)
+def test_slugify_matches_historical_folder_and_file_names(name, slug):
+    assert slugify(name) == slug
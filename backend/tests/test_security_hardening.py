@@ -34,6 +34,13 @@ def test_prompt_api_keys_are_one_way_hashed():
     assert raw not in hash_api_key(raw)
 
 
+def test_prompt_api_key_digest_uses_pepper_when_configured(monkeypatch):
+    raw = "pm_example-secret"
+    monkeypatch.setattr(auth, "API_KEY_PEPPER", "pepper")
+    assert hash_api_key(raw) == hmac.new(b"pepper", raw.encode(), hashlib.sha256).hexdigest()
+    assert hash_api_key(raw) != hashlib.sha256(raw.encode()).hexdigest()
+
+
 @pytest.mark.parametrize("value", ["..", ".", "a/b", "a\\b", "", "bad\nname"])
 def test_storage_components_reject_traversal(value):
     with pytest.raises(ValueError):
@@ -72,3 +79,26 @@ def test_document_url_rejects_localhost(monkeypatch):
     monkeypatch.setenv("ALLOW_PRIVATE_DOCUMENT_URLS", "false")
     with pytest.raises(UnsafeURL):
         asyncio.run(validate_public_http_url("http://localhost/internal"))
+
+
+def test_password_hashes_are_argon2id_and_legacy_bcrypt_still_verifies():
+    import bcrypt
+
+    hashed = auth.hash_password("correct horse")
+    assert hashed.startswith("$argon2id$")
+    assert auth.verify_password("correct horse", hashed)
+    assert not auth.verify_password("wrong", hashed)
+    assert not auth.password_needs_rehash(hashed)
+
+    legacy = bcrypt.hashpw(b"correct horse", bcrypt.gensalt(rounds=4)).decode()
+    assert auth.verify_password("correct horse", legacy)
+    assert auth.password_needs_rehash(legacy)
+
+
+def test_secret_equals_rejects_empty_and_mismatched_credentials():
+    from core.utils import secret_equals
+
+    assert secret_equals("service-key", "service-key")
+    assert not secret_equals("service-kex", "service-key")
+    assert not secret_equals(None, "service-key")
+    assert not secret_equals("", "")
@@ -0,0 +1,98 @@
+import asyncio
+
+import storage_outbox as outbox
+
+
+class FakeStorage:
+    def __init__(self, manifest_sections):
+        self.calls = []
+        self.manifest = {"sections": list(manifest_sections)}
+
+    async def create_section(self, folder_path, filename, content, version):
+        self.calls.append(("create", filename))
+        return True
+
+    async def delete_section(self, folder_path, filename, version):
+        self.calls.append(("delete", filename))
+        return filename in self.manifest["sections"]
+
+    async def get_manifest(self, folder_path, version):
+        return dict(self.manifest, sections=list(self.manifest["sections"]))
+
+    async def get_prompt_content(self, folder_path, version):
+        return {"manifest": dict(self.manifest, sections=list(self.manifest["sections"]))}
+
+    async def update_manifest(self, folder_path, manifest, version):
+        self.calls.append(("manifest", tuple(manifest["sections"])))
+        self.manifest = manifest
+        return True
+
+
+def test_apply_storage_write_keeps_manifest_in_step():
+    storage = FakeStorage(["01_a.md"])
+    payload = {"folder_path": "prompts/p", "version": "v1"}
+
+    assert asyncio.run(outbox.apply_storage_write(storage, "create_section", {**payload, "filename": "02_b.md", "content": "x"}))
+    assert asyncio.run(outbox.apply_storage_write(storage, "delete_section", {**payload, "filename": "01_a.md"}))
+    assert not asyncio.run(outbox.apply_storage_write(storage, "delete_section", {**payload, "filename": "09_gone.md"}))
+
+    assert storage.calls == [
+        ("create", "02_b.md"),
+        ("manifest", ("01_a.md", "02_b.md")),
+        ("delete", "01_a.md"),
+        ("manifest", ("02_b.md",)),
+        ("delete", "09_gone.md"),
+    ]
+
+
+def test_unordered_creates_are_numbered_when_applied():
+    # "02_b.md" was queued and has already drained: its row is gone and only the
+    # manifest knows it, so the next creates must number against the manifest.
+    storage = FakeStorage(["01_a.md", "02_b.md"])
+    payload = {"folder_path": "prompts/p", "version": "v1", "content": "x"}
+
+    assert asyncio.run(outbox.apply_storage_write(storage, "create_section", {**payload, "name": "c"}))
+    assert asyncio.run(outbox.apply_storage_write(storage, "create_section", {**payload, "name": "d"}))
+
+    assert storage.manifest["sections"] == ["01_a.md", "02_b.md", "03_c.md", "04_d.md"]
+
+
+def test_failed_rows_back_off_then_park(fake_db):
+    cursor = fake_db(outbox)
+    row = {"id": 7, "op": "update_section"}
+
+    outbox._finish_row({**row, "attempts": 0}, "GitHub API error: 502")
+    outbox._finish_row({**row, "attempts": outbox.MAX_ATTEMPTS - 1}, "GitHub API error: 502")
+    outbox._finish_row({**row, "attempts": 0}, "target not found in storage", retry=False)
+
+    assert [params[:2] for _, params in cursor.queries] == [
+        ("pending", 1), ("failed", outbox.MAX_ATTEMPTS), ("failed", 1),
+    ]
+
+
+def test_claim_takes_queue_heads_in_id_order_past_parked_rows(fake_db):
+    cursor = fake_db(outbox, results=[[{"id": 9, "prompt_id": "b"}, {"id": 4, "prompt_id": "a"}]])
+
+    assert [row["id"] for row in outbox._claim_batch()] == [4, 9]
+    sql = " ".join(cursor.queries[0][0].split())
+    # An earlier row only holds a prompt's queue back while it is still waiting
+    assert "e.prompt_id = o.prompt_id AND e.id < o.id AND e.status <> 'failed'" in sql
+
+
+def test_drain_parks_a_write_whose_target_is_gone(monkeypatch, fake_db):
+    storage = FakeStorage([])
+
+    async def update_section(folder_path, filename, content, version):
+        return False
+
+    storage.update_section = update_section
+    monkeypatch.setattr("storage_service.get_storage_service", lambda user_id: storage)
+    payload = '{"folder_path": "prompts/p", "version": "v1", "filename": "%s", "content": "x"}'
+    cursor = fake_db(outbox, results=[[
+        {"id": 2, "user_id": "u", "prompt_id": "p2", "op": "update_section", "payload": payload % "01_a.md", "attempts": 0},
+        {"id": 1, "user_id": "u", "prompt_id": "p1", "op": "create_section", "payload": payload % "02_b.md", "attempts": 0},
+    ]])
+
+    assert asyncio.run(outbox.drain_storage_outbox()) == 2
+    finished = {params[-1]: (sql.split()[0], params[0]) for sql, params in cursor.queries[1:]}
+    assert finished == {1: ("DELETE", 1), 2: ("UPDATE", "failed")}
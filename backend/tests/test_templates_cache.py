@@ -0,0 +1,20 @@
+import routes.templates as templates
+
+
+class _Request:
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+
+
+def test_templates_are_parsed_once_and_revalidated_by_etag(fake_db):
+    cursor = fake_db(templates, results=[
+        [{"id": "t1", "name": "Agent", "description": "", "sections": '[{"name": "role"}]', "created_at": "now"}],
+    ])
+    templates._templates_cache.clear()
+
+    first = templates.get_templates(_Request())
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert templates.get_templates(_Request({"if-none-match": etag})).status_code == 304
+    assert templates.get_template("t1").body == b'{"id":"t1","name":"Agent","description":"","sections":[{"name":"role"}],"created_at":"now"}'
+    assert len(cursor.queries) == 1